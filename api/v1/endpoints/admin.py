@@ -0,0 +1,51 @@
+import hmac
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import settings
+from db.session import get_db
+from repositories.website import WebsiteRepository
+from schemas.website import WebhookUpdate, WebhookUpdateResponse
+from services.api_key_cache import api_key_cache
+from services.transaction_cache import transaction_cache
+from utils.timing import get_slow_requests
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin endpoints are disabled unless ADMIN_TOKEN is configured"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.get("/slow-requests")
+async def slow_requests(limit: int = Query(100, ge=1, le=1000)):
+    """Most recent requests slower than SLOW_REQUEST_THRESHOLD_MS, newest first"""
+    return {
+        "threshold_ms": settings.SLOW_REQUEST_THRESHOLD_MS,
+        "requests": get_slow_requests(limit)
+    }
+
+@router.get("/cache-stats")
+async def cache_stats():
+    """Hit/miss counters of this worker's caches"""
+    return {
+        "api_key": api_key_cache.stats(),
+        "transaction": transaction_cache.stats()
+    }
+
+@router.put("/websites/{website_id}/webhook", response_model=WebhookUpdateResponse)
+async def set_webhook(website_id: int, webhook: WebhookUpdate, db: AsyncSession = Depends(get_db)):
+    """Set or clear a website's webhook URL; returns the new signing secret"""
+    try:
+        website = await WebsiteRepository(db).set_webhook(website_id, webhook.webhook_url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not website:
+        raise HTTPException(status_code=404, detail="Website not found")
+    return WebhookUpdateResponse(
+        website_id=website.id,
+        webhook_url=website.webhook_url,
+        webhook_secret=website.webhook_secret
+    )
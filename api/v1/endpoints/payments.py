@@ -1,8 +1,7 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
-from db.session import get_db
+from fastapi import APIRouter
 from fastapi.responses import RedirectResponse
-from repositories.transaction import TransactionRepository
+from services.transaction_cache import transaction_cache
+from services.payment.factory import get_provider_health
 from utils.logger import logger
 from core.config import settings
 router = APIRouter()
@@ -10,27 +9,31 @@ router = APIRouter()
 @router.get("/callback")
 async def payment_callback(
     Authority: str,
-    Status: str,
-    db: AsyncSession = Depends(get_db)
+    Status: str
 ):
     """Handle gateway callback"""
     try:
-        transaction_repo = TransactionRepository(db)
-        transaction = await transaction_repo.get_by_gateway_token(Authority)
+        # Served from the token cache; a DB session is only opened on a miss
+        transaction = await transaction_cache.fetch(Authority)
         
         if not transaction:
-            logger.error(f"Transaction not found for authority: {Authority}")
+            logger.error("Transaction not found for authority: %s", Authority)
             return RedirectResponse(url=f"{settings.ERROR_REDIRECT_URL}")
 
         callback_url = transaction.callback_url
         
         if Status == "OK":
-            logger.info(f"Successful payment callback: {Authority}")
+            logger.info("Successful payment callback: %s", Authority)
             return RedirectResponse(url=f"{callback_url}?Authority={Authority}&Status=OK")
         else:
-            logger.warning(f"Failed payment callback: {Authority}")
+            logger.warning("Failed payment callback: %s", Authority)
             return RedirectResponse(url=f"{callback_url}?Authority={Authority}&Status=NOK")
 
     except Exception as e:
-        logger.error(f"Callback error: {str(e)}")
-        return RedirectResponse(url=f"{settings.ERROR_REDIRECT_URL}") 
\ No newline at end of file
+        logger.error("Callback error: %s", e)
+        return RedirectResponse(url=f"{settings.ERROR_REDIRECT_URL}")
+
+@router.get("/health")
+async def gateway_health():
+    """Circuit breaker state per payment provider"""
+    return get_provider_health()
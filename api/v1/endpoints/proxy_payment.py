@@ -1,73 +1,130 @@
-from fastapi import APIRouter, Depends, Header
+from fastapi import APIRouter, Depends, Header, Query
+from typing import Optional, Literal
+from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from db.session import get_db
 from services.payment.proxy_payment import ProxyPaymentService
-from schemas.payment import PaymentCreate, PaymentCreateResponse
-from fastapi.responses import RedirectResponse
+from services.transaction_cache import transaction_cache
+from services.rate_limit import rate_limit
+from services.export import CONTENT_TYPES
+from schemas.payment import PaymentCreate, PaymentCreateResponse, PaymentBatchVerify, PaymentBatchVerifyResponse
+from schemas.transaction import TransactionListResponse
+from fastapi.responses import RedirectResponse, StreamingResponse
 from fastapi import HTTPException
-from utils.logger import logger
+from utils.serialization import FastJSONResponse
 router = APIRouter()
 
-@router.post("/create", response_model=PaymentCreateResponse)
+@router.post("/create", response_model=PaymentCreateResponse, dependencies=[Depends(rate_limit("create"))])
 async def create_payment(
     payment: PaymentCreate,
     x_api_key: str = Header(...),
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     db: AsyncSession = Depends(get_db)
 ):
     """Check if website exists with given API key"""
+    # API key is validated (and cached) inside the service
     payment_service = ProxyPaymentService(db)
-    try:
-        # Validate API key first - will raise HTTPException if invalid
-        if not await payment_service.validate_api_key(x_api_key):
-            logger.warning(f"Invalid API key attempt: {x_api_key}")
-            raise HTTPException(status_code=403, detail="Invalid API key")
-    except HTTPException:
-        logger.warning(f"Invalid API key attempt: {x_api_key}")
-        raise HTTPException(status_code=403, detail="Invalid API key")
 
     result = await payment_service.create_payment(
         api_key=x_api_key,
         amount=payment.amount,
         user_phone=payment.user_phone,
-        callback_url=str(payment.callback_url)
+        callback_url=str(payment.callback_url),
+        idempotency_key=idempotency_key
     )
-    return result
+    # Built by the service, so skip response_model validation
+    return FastJSONResponse(result)
 
 @router.get("/process/{gateway_token}")
-async def process_payment(
-    gateway_token: str,
-    db: AsyncSession = Depends(get_db)
-):
+async def process_payment(gateway_token: str):
     """Redirect to payment gateway"""
-    payment_service = ProxyPaymentService(db)
-    # Validate API key and check if transaction belongs to website
-    transaction = await payment_service.transaction_repo.get_by_gateway_token(gateway_token)
+    # Served from the token cache; a DB session is only opened on a miss
+    transaction = await transaction_cache.fetch(gateway_token)
     
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
         
-    result = await payment_service.process_payment(gateway_token)
-    return RedirectResponse(url=result["redirect_url"])
+    return RedirectResponse(url=transaction.gateway_url)
 
-@router.post("/verify")
+@router.post("/verify", dependencies=[Depends(rate_limit("verify"))])
 async def verify_payment(
     authority: str,
     x_api_key: str = Header(...),
     db: AsyncSession = Depends(get_db)
 ):
     """Verify payment with gateway"""
+    # API key is validated (and cached) inside the service
     payment_service = ProxyPaymentService(db)
-    try:
-        # Validate API key first - will raise HTTPException if invalid
-        if not await payment_service.validate_api_key(x_api_key):
-            logger.warning(f"Invalid API key attempt: {x_api_key}")
-            raise HTTPException(status_code=403, detail="Invalid API key")
-    except HTTPException:
-        logger.warning(f"Invalid API key attempt: {x_api_key}")
-        raise HTTPException(status_code=403, detail="Invalid API key")
 
     result = await payment_service.verify_payment(
         authority=authority,
         website_token=x_api_key
     )
-    return result 
\ No newline at end of file
+    return FastJSONResponse(result)
+
+@router.post(
+    "/verify/batch",
+    response_model=PaymentBatchVerifyResponse,
+    dependencies=[Depends(rate_limit("verify_batch"))]
+)
+async def verify_payments(
+    payload: PaymentBatchVerify,
+    x_api_key: str = Header(...),
+    db: AsyncSession = Depends(get_db)
+):
+    """Verify many payments at once and return per-authority results"""
+    payment_service = ProxyPaymentService(db)
+    results = await payment_service.verify_payments(
+        authorities=payload.authorities,
+        website_token=x_api_key
+    )
+    return FastJSONResponse({"results": results})
+
+@router.get(
+    "/transactions",
+    response_model=TransactionListResponse,
+    dependencies=[Depends(rate_limit("transactions"))]
+)
+async def list_transactions(
+    status: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    x_api_key: str = Header(...),
+    db: AsyncSession = Depends(get_db)
+):
+    """List the merchant's transactions, newest first; pass next_cursor to get the next page"""
+    payment_service = ProxyPaymentService(db)
+    page = await payment_service.list_transactions(
+        api_key=x_api_key,
+        status=status,
+        limit=limit,
+        cursor=cursor
+    )
+    return FastJSONResponse(page)
+
+@router.get("/transactions/export", dependencies=[Depends(rate_limit("export"))])
+async def export_transactions(
+    format: Literal["csv", "ndjson"] = "csv",
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    x_api_key: str = Header(...),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stream the merchant's transactions, oldest first, as gzip-compressed CSV or NDJSON"""
+    payment_service = ProxyPaymentService(db)
+    stream = await payment_service.export_transactions(
+        api_key=x_api_key,
+        fmt=format,
+        status=status,
+        created_from=created_from,
+        created_to=created_to
+    )
+    return StreamingResponse(
+        stream,
+        media_type=CONTENT_TYPES[format],
+        headers={
+            "Content-Encoding": "gzip",
+            "Content-Disposition": f'attachment; filename="transactions.{format}"'
+        }
+    )
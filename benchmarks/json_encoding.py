@@ -0,0 +1,70 @@
+"""
+Micro-benchmark of response encoding on the hot endpoints.
+
+Compares FastAPI's default path (response_model validation, then stdlib json)
+with rendering the service's dict directly through orjson.
+
+    python -m benchmarks.json_encoding --number 20000
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from schemas.payment import PaymentCreateResponse
+from schemas.transaction import TransactionListResponse
+from utils.serialization import dumps
+
+
+def create_body():
+    return {
+        "status": True,
+        "token": "A000000000000000000000000000001234567",
+        "payment_url": "https://pay.example.com/payments/process/A000000000000000000000000000001234567"
+    }
+
+
+def list_body(size: int = 50):
+    now = datetime.now(timezone.utc)
+    return {
+        "items": [
+            {
+                "id": i,
+                "gateway_token": f"A{i:035d}",
+                "amount": Decimal("150000.00"),
+                "status": "completed",
+                "ref_id": str(10 ** 8 + i),
+                "created_at": now - timedelta(minutes=i)
+            }
+            for i in range(size)
+        ],
+        "next_cursor": "MjAyNC0wMS0wMVQwMDowMDowMCswMDowMHwxMjM="
+    }
+
+
+def validated(model, body) -> bytes:
+    # What a response_model endpoint does before JSONResponse.render
+    content = model.model_validate(body).model_dump(mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def run(name: str, model, body, number: int):
+    baseline = timeit.timeit(lambda: validated(model, body), number=number)
+    fast = timeit.timeit(lambda: dumps(body), number=number)
+    print(
+        f"{name:<14}{baseline / number * 1e6:>18.2f}{fast / number * 1e6:>12.2f}{baseline / fast:>9.1f}x"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'body':<14}{'pydantic+json us':>18}{'orjson us':>12}{'speedup':>10}")
+    run("create", PaymentCreateResponse, create_body(), args.number)
+    run("list (50)", TransactionListResponse, list_body(), max(1, args.number // 10))
+
+
+if __name__ == "__main__":
+    main()
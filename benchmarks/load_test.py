@@ -0,0 +1,240 @@
+"""
+Load test for the payment flow against local stub gateways.
+
+Starts the stub gateways and the app (uvicorn) pointed at them, then drives
+create -> process -> callback -> verify at a fixed rate of flows per second
+and reports throughput and p50/p95/p99 latency per endpoint. Results are
+compared to a stored baseline and the run fails on regression.
+
+    python -m benchmarks.load_test --rps 50 --duration 30
+    python -m benchmarks.load_test --rps 50 --duration 30 --update-baseline
+
+Postgres and Redis from docker-compose (or the usual .env) must be reachable
+and migrated; a benchmark website is created on first run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+import aiohttp
+from benchmarks.stub_gateways import start_stub
+
+ENDPOINTS = ("create", "process", "callback", "verify")
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+BENCH_DOMAIN = "bench.local"
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def timed(self, endpoint: str, request) -> Optional[aiohttp.ClientResponse]:
+        start = time.perf_counter()
+        try:
+            async with request as response:
+                await response.read()
+                ok = response.status < 400
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            response, ok = None, False
+        elapsed = (time.perf_counter() - start) * 1000
+        if ok:
+            self.latencies[endpoint].append(elapsed)
+        else:
+            self.errors[endpoint] += 1
+        return response if ok else None
+
+    def report(self, duration: float) -> Dict[str, Dict[str, float]]:
+        results = {}
+        for endpoint in ENDPOINTS:
+            samples = self.latencies[endpoint]
+            results[endpoint] = {
+                "throughput": round(len(samples) / duration, 2),
+                "errors": self.errors[endpoint],
+                "p50": round(percentile(samples, 50), 2),
+                "p95": round(percentile(samples, 95), 2),
+                "p99": round(percentile(samples, 99), 2),
+            }
+        return results
+
+
+async def run_flow(session: aiohttp.ClientSession, app_url: str, api_key: str, recorder: Recorder):
+    headers = {"x-api-key": api_key}
+    response = await recorder.timed("create", session.post(
+        f"{app_url}/payments/create",
+        json={"amount": "1000", "user_phone": "09120000000", "callback_url": f"https://{BENCH_DOMAIN}/done"},
+        headers=headers
+    ))
+    if response is None:
+        return
+    token = (await response.json())["token"]
+
+    await recorder.timed("process", session.get(
+        f"{app_url}/payments/process/{token}", allow_redirects=False
+    ))
+    await recorder.timed("callback", session.get(
+        f"{app_url}/gateway/callback", params={"Authority": token, "Status": "OK"}, allow_redirects=False
+    ))
+    await recorder.timed("verify", session.post(
+        f"{app_url}/payments/verify", params={"authority": token}, headers=headers
+    ))
+
+
+async def drive(app_url: str, api_key: str, rps: float, duration: float, recorder: Recorder) -> float:
+    """Open-loop load: flows start on schedule regardless of how slow earlier ones are"""
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30)) as session:
+        tasks = []
+        start = time.perf_counter()
+        interval = 1.0 / rps
+        for i in range(int(rps * duration)):
+            delay = start + i * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(run_flow(session, app_url, api_key, recorder)))
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+
+async def seed_website() -> str:
+    """Create (or reuse) the benchmark website and return its API key"""
+    from sqlalchemy import select
+    from db.session import async_session, dispose_engines
+    from models.website import Website
+    from repositories.website import WebsiteRepository
+
+    try:
+        async with async_session() as db:
+            result = await db.execute(select(Website).where(Website.domain == BENCH_DOMAIN))
+            website = result.scalars().first()
+            if website is None:
+                website = await WebsiteRepository(db).create(domain=BENCH_DOMAIN, name="benchmark")
+            return website.api_key
+    finally:
+        await dispose_engines()
+
+
+async def wait_for_app(app_url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{app_url}/") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"App at {app_url} did not become ready")
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    regressions = []
+    for endpoint, current in results.items():
+        expected = baseline.get(endpoint)
+        if not expected:
+            continue
+        for metric in ("p95", "p99"):
+            limit = expected[metric] * (1 + tolerance)
+            if current[metric] > limit:
+                regressions.append(f"{endpoint} {metric} {current[metric]}ms > {limit:.2f}ms")
+        floor = expected["throughput"] * (1 - tolerance)
+        if current["throughput"] < floor:
+            regressions.append(f"{endpoint} throughput {current['throughput']}/s < {floor:.2f}/s")
+        if current["errors"] > expected["errors"]:
+            regressions.append(f"{endpoint} errors {current['errors']} > {expected['errors']}")
+    return regressions
+
+
+async def main_async(args) -> int:
+    stub = await start_stub(
+        "127.0.0.1", args.stub_port,
+        latency_ms=args.gateway_latency_ms,
+        error_rate=args.gateway_error_rate
+    )
+    app_process = None
+    app_url = args.app_url or f"http://127.0.0.1:{args.app_port}"
+    try:
+        if not args.app_url:
+            stub_url = f"http://127.0.0.1:{args.stub_port}"
+            env = {
+                **os.environ,
+                "PAYMENT_GATEWAY": args.gateway,
+                "ZARINPAL_API_BASE": stub_url,
+                "ZIBAL_API_BASE": stub_url,
+                "BASE_URL": app_url,
+                "RATE_LIMIT_ENABLED": "false",
+                "RECONCILE_ENABLED": "false",
+                "LOG_INFO_SAMPLE_RATE": "0.01",
+            }
+            app_process = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.app_port), "--log-level", "warning"],
+                env=env
+            )
+            await wait_for_app(app_url)
+
+        api_key = args.api_key or await seed_website()
+
+        recorder = Recorder()
+        elapsed = await drive(app_url, api_key, args.rps, args.duration, recorder)
+        results = recorder.report(elapsed)
+    finally:
+        if app_process is not None:
+            app_process.terminate()
+            app_process.wait(timeout=30)
+        await stub.cleanup()
+
+    print(f"{'endpoint':<10}{'req/s':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for endpoint, row in results.items():
+        print(f"{endpoint:<10}{row['throughput']:>10}{row['errors']:>8}{row['p50']:>10}{row['p95']:>10}{row['p99']:>10}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline stored; run with --update-baseline to create one")
+        return 0
+
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=float, default=20.0, help="payment flows started per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--gateway", choices=("zarinpal", "zibal"), default="zarinpal")
+    parser.add_argument("--gateway-latency-ms", type=float, default=50.0)
+    parser.add_argument("--gateway-error-rate", type=float, default=0.0)
+    parser.add_argument("--stub-port", type=int, default=9100)
+    parser.add_argument("--app-port", type=int, default=8100)
+    parser.add_argument("--app-url", help="use an already running app instead of starting one")
+    parser.add_argument("--api-key", help="API key of an existing website for the bench.local domain")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Local stand-ins for the Zarinpal v4 and Zibal request/verify APIs.
+
+    python -m benchmarks.stub_gateways --port 9100 --latency-ms 80 --error-rate 0.01
+
+Point the app at them with ZARINPAL_API_BASE / ZIBAL_API_BASE.
+"""
+import argparse
+import asyncio
+import itertools
+import random
+from aiohttp import web
+
+
+class StubGateway:
+    def __init__(self, latency_ms: float = 50.0, jitter_ms: float = 20.0, error_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._ids = itertools.count(1)
+        self._verified = set()
+
+    async def _delay(self):
+        delay = max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+
+    def _fail(self) -> bool:
+        return random.random() < self.error_rate
+
+    # Zarinpal v4
+
+    async def zarinpal_request(self, request: web.Request) -> web.Response:
+        await self._delay()
+        if self._fail():
+            return web.json_response({"data": [], "errors": {"code": -9, "message": "stub failure"}}, status=500)
+        authority = f"A{next(self._ids):035d}"
+        return web.json_response({"data": {"code": 100, "message": "Success", "authority": authority}, "errors": []})
+
+    async def zarinpal_verify(self, request: web.Request) -> web.Response:
+        await self._delay()
+        if self._fail():
+            return web.json_response({"data": [], "errors": {"code": -9, "message": "stub failure"}}, status=500)
+        body = await request.json()
+        authority = body.get("authority")
+        code = 101 if authority in self._verified else 100
+        self._verified.add(authority)
+        return web.json_response({"data": {"code": code, "ref_id": abs(hash(authority)) % 10 ** 9}, "errors": []})
+
+    # Zibal
+
+    async def zibal_request(self, request: web.Request) -> web.Response:
+        await self._delay()
+        if self._fail():
+            return web.json_response({"result": -2, "message": "stub failure"}, status=500)
+        return web.json_response({"result": 100, "trackId": next(self._ids), "message": "success"})
+
+    async def zibal_verify(self, request: web.Request) -> web.Response:
+        await self._delay()
+        if self._fail():
+            return web.json_response({"result": -2, "message": "stub failure"}, status=500)
+        body = await request.json()
+        track_id = str(body.get("trackId"))
+        if track_id in self._verified:
+            return web.json_response({"result": 201, "message": "already verified"})
+        self._verified.add(track_id)
+        return web.json_response({"result": 100, "refNumber": abs(hash(track_id)) % 10 ** 9, "message": "success"})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([
+            web.post("/pg/v4/payment/request.json", self.zarinpal_request),
+            web.post("/pg/v4/payment/verify.json", self.zarinpal_verify),
+            web.post("/v1/request", self.zibal_request),
+            web.post("/v1/verify", self.zibal_verify),
+        ])
+        return app
+
+
+async def start_stub(host: str, port: int, **options) -> web.AppRunner:
+    runner = web.AppRunner(StubGateway(**options).app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = StubGateway(args.latency_ms, args.jitter_ms, args.error_rate)
+    web.run_app(stub.app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
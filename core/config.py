@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
-from typing import Optional
+from typing import Optional, Dict
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Gateway Proxy"
@@ -14,6 +14,24 @@ class Settings(BaseSettings):
     POSTGRES_DB: str
     POSTGRES_PORT: int = 5432
     DATABASE_URL: Optional[str] = None
+    DATABASE_REPLICA_URL: Optional[str] = None
+
+    # Database engine
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PGBOUNCER_MODE: bool = False
+    DB_POOL_WARMUP: int = 5
+    # Group commit: batch concurrent transaction inserts/status updates into
+    # one statement and one commit per flush
+    DB_GROUP_COMMIT_ENABLED: bool = False
+    DB_GROUP_COMMIT_WORKERS: int = 2
+    DB_GROUP_COMMIT_MAX_BATCH: int = 200
+    DB_GROUP_COMMIT_WINDOW_MS: float = 0.0  # extra wait for more operations; 0 = take what is queued
 
     @property
     def SQLALCHEMY_DATABASE_URL(self) -> str:
@@ -22,6 +40,26 @@ class Settings(BaseSettings):
     # Redis
     REDIS_HOST: str = "redis"
     REDIS_PORT: int = 6379
+    REDIS_DB: int = 0
+    REDIS_PASSWORD: Optional[str] = None
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_SOCKET_TIMEOUT: float = 2.0
+    REDIS_CONNECT_TIMEOUT: float = 2.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30  # ping idle connections before reuse
+
+    # API key cache
+    API_KEY_CACHE_MAXSIZE: int = 10000
+    API_KEY_CACHE_TTL: int = 60
+    API_KEY_CACHE_NEGATIVE_TTL: int = 30
+
+    # Gateway token cache
+    TRANSACTION_CACHE_MAXSIZE: int = 50000
+    TRANSACTION_CACHE_LOCAL_TTL: int = 60
+    TRANSACTION_CACHE_TTL: int = 60 * 60
+
+    # Transaction stats counters
+    STATS_RECONCILE_INTERVAL: int = 60 * 60
+    STATS_SEED_TTL: int = 5 * 60  # longest a seed's aggregate may take before it is abandoned
     
     # JWT
     SECRET_KEY: str
@@ -35,6 +73,18 @@ class Settings(BaseSettings):
     HOST: str = "0.0.0.0"
     SOURCE_COMMIT: str = '7d5b2b82dc95340f35f7ec64a869e28acafb5db6'
 
+    # Production server (python -m serve)
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0  # 0 = one per CPU available to the process
+    SERVER_MAX_WORKERS: int = 16  # caps the automatic count; every worker has its own DB pool
+    SERVER_BACKLOG: int = 2048  # pending connections the listen socket queues
+    SERVER_KEEPALIVE: int = 75  # seconds; keep above the load balancer's idle timeout
+    SERVER_TIMEOUT: int = 60  # a worker silent this long is restarted
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    SERVER_MAX_REQUESTS: int = 0  # recycle a worker after this many requests, 0 = never
+    SERVER_MAX_REQUESTS_JITTER: int = 0
+    SERVER_LIMIT_CONCURRENCY: Optional[int] = None  # per worker; excess requests get 503
+
     # Payment Gateway
     PAYMENT_GATEWAY: str = "zarinpal"
     ZARINPAL_MERCHANT_ID: str
@@ -42,6 +92,102 @@ class Settings(BaseSettings):
     PAYMENT_CALLBACK: str = "https://pay.roblit.ir/payment/callback"
     ZARINPAL_GATEWAY_URL: str = "https://www.zarinpal.com/pg/StartPay/"
     ZIBAL_MERCHANT_ID: str
+    # Extra merchant accounts by name, e.g. {"zibal_b": {"gateway": "zibal", "merchant_id": "..."}}.
+    # "zarinpal" and "zibal" are always registered from the merchant ids above;
+    # PAYMENT_GATEWAY names the account used by websites that don't choose one.
+    PAYMENT_ACCOUNTS: Dict[str, Dict[str, str]] = {}
+    # Override gateway hosts, e.g. to point at the benchmark stub gateways
+    ZARINPAL_API_BASE: Optional[str] = None
+    ZIBAL_API_BASE: Optional[str] = None
+
+    # Outbound HTTP (gateway calls)
+    HTTP_POOL_LIMIT: int = 100
+    HTTP_POOL_LIMIT_PER_HOST: int = 20
+    HTTP_DNS_CACHE_TTL: int = 300
+    HTTP_KEEPALIVE_TIMEOUT: float = 30.0
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_READ_TIMEOUT: float = 10.0  # keep equal to the GATEWAY_*_TIMEOUT deadlines
+
+    # Gateway resilience
+    GATEWAY_CREATE_TIMEOUT: float = 10.0
+    GATEWAY_VERIFY_TIMEOUT: float = 10.0
+    GATEWAY_VERIFY_RETRIES: int = 2
+    GATEWAY_RETRY_BASE_DELAY: float = 0.2
+    GATEWAY_RETRY_MAX_DELAY: float = 2.0
+    GATEWAY_BREAKER_FAILURE_THRESHOLD: int = 5
+    GATEWAY_BREAKER_RECOVERY_TIMEOUT: float = 30.0
+
+    # Rate limiting, requests per minute per website and endpoint.
+    # Websites can override these through their rate_limits column.
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMITS: Dict[str, int] = {
+        "create": 120,
+        "verify": 300,
+        "verify_batch": 30,
+        "transactions": 60,
+        "export": 10
+    }
+    RATE_LIMIT_BURST_SECONDS: int = 10
+
+    # Idempotency keys for /payments/create
+    IDEMPOTENCY_TTL: int = 60 * 60 * 24
+    IDEMPOTENCY_LOCK_TTL: int = 60
+    IDEMPOTENCY_WAIT_TIMEOUT: float = 30.0
+
+    # Verify single-flight
+    VERIFY_LOCK_TTL: int = 30  # renewed while the verify runs; bounds how long a crashed holder blocks others
+    VERIFY_WAIT_TIMEOUT: float = 30.0
+
+    # Batch verify
+    BATCH_VERIFY_MAX_ITEMS: int = 100
+    BATCH_VERIFY_CONCURRENCY: int = 10
+
+    # Transaction export
+    EXPORT_CHUNK_ROWS: int = 1000
+    EXPORT_COMPRESSION_LEVEL: int = 6
+
+    # Pending transaction reconciliation
+    RECONCILE_ENABLED: bool = True
+    RECONCILE_INTERVAL: int = 300
+    RECONCILE_MIN_AGE: int = 15 * 60
+    PENDING_EXPIRY: int = 60 * 60 * 24
+    RECONCILE_BATCH_SIZE: int = 100
+    RECONCILE_MAX_BATCHES: int = 50
+    RECONCILE_CONCURRENCY: int = 5
+    RECONCILE_LEASE_SECONDS: int = 15 * 60  # rows a crashed worker leased become claimable after this
+
+    # Merchant webhooks
+    WEBHOOK_ENABLED: bool = True
+    WEBHOOK_CONCURRENCY: int = 50
+    WEBHOOK_PER_WEBSITE_CONCURRENCY: int = 4
+    WEBHOOK_MAX_ATTEMPTS: int = 10
+    WEBHOOK_RETRY_BASE_DELAY: float = 10.0
+    WEBHOOK_RETRY_MAX_DELAY: float = 60 * 60
+    WEBHOOK_LEASE_SECONDS: int = 60
+    WEBHOOK_POLL_INTERVAL: float = 1.0
+    WEBHOOK_CONNECT_TIMEOUT: float = 5.0
+    WEBHOOK_READ_TIMEOUT: float = 10.0
+
+    # Transaction table partitions (monthly, by created_at)
+    PARTITION_MAINTENANCE_ENABLED: bool = True
+    PARTITION_MAINTENANCE_INTERVAL: int = 6 * 60 * 60
+    PARTITION_MONTHS_AHEAD: int = 3
+    PARTITION_ARCHIVE_ENABLED: bool = True
+    PARTITION_RETENTION_MONTHS: int = 12  # full months kept in Postgres before archiving
+    PARTITION_ARCHIVE_DIR: str = "archive"  # must be persistent storage (a volume) before enabling drop
+    PARTITION_ARCHIVE_DROP: bool = False  # drop archived partitions; False keeps them detached
+    PARTITION_LOCK_TIMEOUT_MS: int = 2000
+
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True
+    LOG_INFO_SAMPLE_RATE: float = 1.0
+    LOG_QUEUE_SIZE: int = 10000
+
+    # Request timing
+    SLOW_REQUEST_THRESHOLD_MS: float = 1000.0
+    SLOW_REQUEST_BUFFER_SIZE: int = 200
+    ADMIN_TOKEN: Optional[str] = None
 
     # Application
     BASE_URL: str = "https://pay.example.com"
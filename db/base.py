@@ -1,3 +1,6 @@
 from .base_class import Base
 from models.transaction import Transaction
-from models.website import Website 
\ No newline at end of file
+from models.website import Website
+from models.webhook_event import WebhookEvent
+from models.transaction_archive import TransactionArchive, TransactionArchiveStats
+from models.transaction_token import TransactionToken
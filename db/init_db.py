@@ -1,10 +1,19 @@
-from sqlalchemy import create_engine
-from core.config import settings
-from .base_class import Base
-from models.transaction import Transaction
+"""
+Schema setup, run once per deploy rather than on every worker start:
 
+    python -m db.init_db
+"""
+import os
+from alembic import command
+from alembic.config import Config
 
-def init_db():
-    DATABASE_URL = f"postgresql://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}@{settings.POSTGRES_SERVER}/{settings.POSTGRES_DB}"
-    engine = create_engine(DATABASE_URL)
-    Base.metadata.create_all(bind=engine) 
\ No newline at end of file
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+
+def init_db(revision: str = "head"):
+    """Apply alembic migrations up to the given revision"""
+    command.upgrade(Config(ALEMBIC_INI), revision)
+
+
+if __name__ == "__main__":
+    init_db()
@@ -1,18 +1,72 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+import asyncio
+from uuid import uuid4
+from sqlalchemy import Select, text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
+from sqlalchemy.orm import sessionmaker, Session
 from core.config import settings
+from utils.metrics import TimedQueuePool
 
-# Create async engine
-engine = create_async_engine(
-    settings.SQLALCHEMY_DATABASE_URL,
-    echo=True,
-    future=True
+
+def _connect_args() -> dict:
+    if settings.DB_PGBOUNCER_MODE:
+        # PgBouncer in transaction mode can't keep named prepared statements
+        # across transactions, so disable both caches and use unique names
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return {
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+
+
+def _create_engine(url: str, name: str) -> AsyncEngine:
+    engine = create_async_engine(
+        url,
+        poolclass=TimedQueuePool,
+        echo=settings.DB_ECHO,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        connect_args=_connect_args(),
+    )
+    engine.pool.pool_name = name
+    return engine
+
+# Create async engines
+engine = _create_engine(settings.SQLALCHEMY_DATABASE_URL, "primary")
+replica_engine = (
+    _create_engine(settings.DATABASE_REPLICA_URL, "replica")
+    if settings.DATABASE_REPLICA_URL
+    else None
 )
 
+
+class RoutingSession(Session):
+    """
+    Send SELECTs marked with ``execution_options(use_replica=True)`` to the
+    read replica when one is configured; everything else, including flushes,
+    goes to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            replica_engine is not None
+            and not self._flushing
+            and isinstance(clause, Select)
+            and clause.get_execution_options().get("use_replica")
+        ):
+            return replica_engine.sync_engine
+        return engine.sync_engine
+
+
 # Create async session factory
 async_session = sessionmaker(
-    engine,
     class_=AsyncSession,
+    sync_session_class=RoutingSession,
     expire_on_commit=False,
     autocommit=False,
     autoflush=False
@@ -24,4 +78,37 @@ async def get_db() -> AsyncSession:
         try:
             yield session
         finally:
-            await session.close() 
\ No newline at end of file
+            await session.close()
+
+async def dispose_engines():
+    await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+
+async def _warm_up(target: AsyncEngine, connections: int):
+    # Hold every connection open at once so the pool really grows to size
+    barrier = asyncio.Event()
+    opened = []
+
+    async def _open():
+        try:
+            async with target.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                opened.append(conn)
+                if len(opened) == connections:
+                    barrier.set()
+                await barrier.wait()
+        except Exception:
+            barrier.set()
+            raise
+
+    await asyncio.gather(*(_open() for _ in range(connections)))
+
+async def warm_up_engines():
+    """Open DB_POOL_WARMUP connections per engine before serving traffic"""
+    connections = min(settings.DB_POOL_WARMUP, settings.DB_POOL_SIZE)
+    if connections <= 0:
+        return
+    await _warm_up(engine, connections)
+    if replica_engine is not None:
+        await _warm_up(replica_engine, connections)
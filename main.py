@@ -1,15 +1,88 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from core.config import settings
-from db.init_db import init_db
-import logging
-from api.v1.endpoints import payments, proxy_payment
-from utils.logger import logger
+from db.session import engine, replica_engine, dispose_engines, warm_up_engines
+from api.v1.endpoints import payments, proxy_payment, admin
+from utils.logger import logger, RequestIdMiddleware
+from utils.metrics import MetricsMiddleware, register_pool_collector, render_metrics
+from utils.timing import ServerTimingMiddleware
+from services.payment.factory import start_payment_providers, close_payment_providers
+from services.api_key_cache import api_key_cache
+from services.transaction_stats import transaction_stats
+from services.reconciliation import pending_reconciler
+from services.webhooks import webhook_dispatcher
+from services.partitions import partition_manager
+from services.group_commit import group_committer
+from utils.redis import redis
+from utils.serialization import FastJSONResponse
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema setup is not done here; run `python -m db.init_db` once per deploy
+    try:
+        # Fill the connection pool before accepting requests
+        await warm_up_engines()
+
+        # Open the shared Redis connection pool
+        await redis.connect()
+
+        # Batch transaction writes when DB_GROUP_COMMIT_ENABLED
+        group_committer.start()
+
+        # Open pooled gateway HTTP sessions
+        await start_payment_providers()
+
+        # Listen for API key cache invalidations from other replicas
+        api_key_cache.start()
+
+        # Periodically reconcile stats counters with the transaction table
+        transaction_stats.start()
+
+        # Re-verify and expire abandoned pending transactions
+        pending_reconciler.start()
+
+        # Create upcoming transaction partitions and archive old ones
+        partition_manager.start()
+
+        # Deliver queued merchant webhooks
+        await webhook_dispatcher.start()
+
+        logger.info("Application startup completed")
+
+    except Exception as e:
+        logger.error("Error in startup: %s", e)
+        raise
+
+    yield
+
+    try:
+        # Stop background workers before closing what they use
+        await pending_reconciler.stop()
+        await partition_manager.stop()
+        await group_committer.stop()
+        await webhook_dispatcher.stop()
+
+        # Close gateway HTTP sessions
+        await close_payment_providers()
+        await api_key_cache.stop()
+        await transaction_stats.stop()
+        await redis.disconnect()
+
+        # Close database connection pools
+        await dispose_engines()
+
+    except Exception as e:
+        logger.error("Error in shutdown: %s", e)
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 # Set up CORS
@@ -21,33 +94,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Server-Timing header and slow request capture
+app.add_middleware(ServerTimingMiddleware)
+
+# Correlation id for every request's log records (wraps the timing middleware
+# so slow request entries carry it)
+app.add_middleware(RequestIdMiddleware)
+
+# Per-route latency histograms
+app.add_middleware(MetricsMiddleware)
+register_pool_collector({"primary": engine, "replica": replica_engine})
+
 
 app.include_router(payments.router, prefix="/gateway", tags=["gateway"])
 app.include_router(proxy_payment.router, prefix="/payments", tags=["payments"]) 
+app.include_router(admin.router, prefix="/admin", tags=["admin"], include_in_schema=False)
 
-# Add database to app state
-@app.on_event("startup")
-async def startup():
-    try:
-        # Initialize database
-        init_db()
-        
-        logger.info("Application startup completed")
-        
-    except Exception as e:
-        logger.error(f"Error in startup: {str(e)}")
-        raise
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
-@app.on_event("shutdown")
-async def shutdown():
-    try:
-        # Close database connection
-        if hasattr(app.state, "db"):
-            await app.state.db.close()
-        
-    except Exception as e:
-        logger.error(f"Error in shutdown: {str(e)}")
+@app.get("/health", include_in_schema=False)
+async def health():
+    redis_health = await redis.health()
+    status_code = 200 if redis_health["status"] == "ok" else 503
+    return FastJSONResponse({"redis": redis_health}, status_code=status_code)
 
 @app.get("/")
 def read_root():
-    return {"Hello": "World"} 
\ No newline at end of file
+    return {"Hello": "World"}
@@ -0,0 +1,52 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "website",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("domain", sa.String()),
+        sa.Column("api_key", sa.String(), unique=True),
+        sa.Column("name", sa.String()),
+        sa.Column("is_active", sa.Boolean()),
+        if_not_exists=True,
+    )
+    op.create_index("ix_website_id", "website", ["id"], if_not_exists=True)
+    op.create_index("ix_website_domain", "website", ["domain"], unique=True, if_not_exists=True)
+
+    op.create_table(
+        "transaction",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("website_id", sa.Integer(), sa.ForeignKey("website.id")),
+        sa.Column("amount", sa.Numeric(10, 2)),
+        sa.Column("status", sa.String()),
+        sa.Column("ref_id", sa.String(), nullable=True),
+        sa.Column("user_phone", sa.String()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.Column("callback_url", sa.String()),
+        sa.Column("gateway_token", sa.String(), unique=True, nullable=True),
+        sa.Column("gateway_url", sa.String(), nullable=True),
+        if_not_exists=True,
+    )
+    op.create_index("ix_transaction_id", "transaction", ["id"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_transaction_id", table_name="transaction")
+    op.drop_table("transaction")
+    op.drop_index("ix_website_domain", table_name="website")
+    op.drop_index("ix_website_id", table_name="website")
+    op.drop_table("website")
@@ -0,0 +1,39 @@
+"""transaction listing indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Built concurrently so deploys don't lock writes on a large table
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_transaction_website_created",
+            "transaction",
+            ["website_id", "created_at", "id"],
+            postgresql_include=["status", "amount", "ref_id", "gateway_token"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_transaction_website_status_created",
+            "transaction",
+            ["website_id", "status", "created_at", "id"],
+            postgresql_include=["amount", "ref_id", "gateway_token"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_transaction_website_status_created", table_name="transaction", postgresql_concurrently=True)
+        op.drop_index("ix_transaction_website_created", table_name="transaction", postgresql_concurrently=True)
@@ -0,0 +1,21 @@
+"""website rate limits
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("website", sa.Column("rate_limits", sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("website", "rate_limits")
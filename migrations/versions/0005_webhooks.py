@@ -0,0 +1,48 @@
+"""webhook delivery
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("website", sa.Column("webhook_url", sa.String(), nullable=True))
+    op.add_column("website", sa.Column("webhook_secret", sa.String(), nullable=True))
+
+    op.create_table(
+        "webhookevent",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("website_id", sa.Integer(), sa.ForeignKey("website.id")),
+        sa.Column("transaction_id", sa.Integer()),
+        sa.Column("event", sa.String()),
+        sa.Column("payload", sa.JSON()),
+        sa.Column("status", sa.String()),
+        sa.Column("attempts", sa.Integer()),
+        sa.Column("last_error", sa.String(), nullable=True),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("delivered_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_webhookevent_id", "webhookevent", ["id"])
+    op.create_index(
+        "ix_webhookevent_pending_due",
+        "webhookevent",
+        ["next_attempt_at"],
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_webhookevent_pending_due", table_name="webhookevent")
+    op.drop_index("ix_webhookevent_id", table_name="webhookevent")
+    op.drop_table("webhookevent")
+    op.drop_column("website", "webhook_secret")
+    op.drop_column("website", "webhook_url")
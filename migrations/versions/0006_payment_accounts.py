@@ -0,0 +1,24 @@
+"""per-website payment accounts
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Both nullable: existing websites and transactions keep using PAYMENT_GATEWAY
+    op.add_column("website", sa.Column("gateway", sa.String(), nullable=True))
+    op.add_column("transaction", sa.Column("provider", sa.String(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("transaction", "provider")
+    op.drop_column("website", "gateway")
@@ -0,0 +1,171 @@
+"""partition transactions by month
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+
+Rebuilds `transaction` as a table range-partitioned on created_at with one
+partition per month, copying existing rows. Runs under an exclusive lock for
+the duration of the copy, so schedule it in a maintenance window on large
+tables. Future partitions are created by services.partitions.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    "id, website_id, amount, status, ref_id, user_phone, created_at, updated_at, "
+    "callback_url, gateway_token, gateway_url, provider"
+)
+INDEXES = (
+    "ix_transaction_id",
+    "ix_transaction_website_created",
+    "ix_transaction_website_status_created",
+    "ix_transaction_pending_created",
+)
+
+
+def _create_indexes(unique_gateway_token: bool):
+    op.create_index("ix_transaction_id", "transaction", ["id"])
+    op.create_index("ix_transaction_gateway_token", "transaction", ["gateway_token"], unique=unique_gateway_token)
+    op.create_index(
+        "ix_transaction_website_created",
+        "transaction",
+        ["website_id", "created_at", "id"],
+        postgresql_include=["status", "amount", "ref_id", "gateway_token"],
+    )
+    op.create_index(
+        "ix_transaction_website_status_created",
+        "transaction",
+        ["website_id", "status", "created_at", "id"],
+        postgresql_include=["amount", "ref_id", "gateway_token"],
+    )
+    op.create_index(
+        "ix_transaction_pending_created",
+        "transaction",
+        ["created_at", "id"],
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def upgrade():
+    op.execute('ALTER TABLE "transaction" RENAME TO transaction_legacy')
+    op.execute("ALTER TABLE transaction_legacy RENAME CONSTRAINT transaction_pkey TO transaction_legacy_pkey")
+    for index in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {index}")
+
+    # Unique constraints on a partitioned table must include the partition
+    # key, so the primary key becomes (id, created_at) and gateway_token is
+    # indexed per partition. Gateways issue unique tokens anyway.
+    op.execute("""
+        CREATE TABLE "transaction" (
+            id INTEGER NOT NULL DEFAULT nextval('transaction_id_seq'),
+            website_id INTEGER REFERENCES website (id),
+            amount NUMERIC(10, 2),
+            status VARCHAR,
+            ref_id VARCHAR,
+            user_phone VARCHAR,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            updated_at TIMESTAMP WITH TIME ZONE,
+            callback_url VARCHAR,
+            gateway_token VARCHAR,
+            gateway_url VARCHAR,
+            provider VARCHAR,
+            CONSTRAINT transaction_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute('ALTER SEQUENCE transaction_id_seq OWNED BY "transaction".id')
+
+    # Monthly partitions from the oldest row through three months ahead
+    op.execute("""
+        DO $$
+        DECLARE
+            m_start timestamp := date_trunc('month', coalesce(
+                (SELECT min(created_at) FROM transaction_legacy), now()
+            ) AT TIME ZONE 'UTC');
+            m_last timestamp := date_trunc('month', now() AT TIME ZONE 'UTC') + interval '3 months';
+        BEGIN
+            WHILE m_start <= m_last LOOP
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF "transaction" FOR VALUES FROM (%L) TO (%L)',
+                    'transaction_' || to_char(m_start, '"y"YYYY"m"MM'),
+                    m_start AT TIME ZONE 'UTC',
+                    (m_start + interval '1 month') AT TIME ZONE 'UTC'
+                );
+                m_start := m_start + interval '1 month';
+            END LOOP;
+        END $$
+    """)
+
+    op.execute(f"""
+        INSERT INTO "transaction" ({COLUMNS})
+        SELECT {COLUMNS.replace("created_at,", "coalesce(created_at, now()),", 1)}
+        FROM transaction_legacy
+    """)
+    op.execute("DROP TABLE transaction_legacy")
+
+    # Built after the copy; indexes on the parent cascade to every partition
+    _create_indexes(unique_gateway_token=False)
+    op.execute('ANALYZE "transaction"')
+
+    op.create_table(
+        "transactionarchive",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("partition", sa.String(), unique=True),
+        sa.Column("range_start", sa.DateTime(timezone=True)),
+        sa.Column("range_end", sa.DateTime(timezone=True)),
+        sa.Column("path", sa.String()),
+        sa.Column("row_count", sa.Integer()),
+        sa.Column("archived_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_transactionarchive_id", "transactionarchive", ["id"])
+    op.create_table(
+        "transactionarchivestats",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("archive_id", sa.Integer(), sa.ForeignKey("transactionarchive.id")),
+        sa.Column("website_id", sa.Integer()),
+        sa.Column("status", sa.String()),
+        sa.Column("count", sa.Integer()),
+        sa.Column("amount", sa.Numeric(14, 2)),
+    )
+    op.create_index("ix_transactionarchivestats_id", "transactionarchivestats", ["id"])
+    op.create_index("ix_transactionarchivestats_website_id", "transactionarchivestats", ["website_id"])
+
+
+def downgrade():
+    op.drop_index("ix_transactionarchivestats_website_id", table_name="transactionarchivestats")
+    op.drop_index("ix_transactionarchivestats_id", table_name="transactionarchivestats")
+    op.drop_table("transactionarchivestats")
+    op.drop_index("ix_transactionarchive_id", table_name="transactionarchive")
+    op.drop_table("transactionarchive")
+
+    op.execute('ALTER TABLE "transaction" RENAME TO transaction_partitioned')
+    op.execute("ALTER TABLE transaction_partitioned RENAME CONSTRAINT transaction_pkey TO transaction_partitioned_pkey")
+    for index in INDEXES + ("ix_transaction_gateway_token",):
+        op.execute(f"DROP INDEX IF EXISTS {index}")
+
+    op.execute("""
+        CREATE TABLE "transaction" (
+            id INTEGER NOT NULL DEFAULT nextval('transaction_id_seq'),
+            website_id INTEGER REFERENCES website (id),
+            amount NUMERIC(10, 2),
+            status VARCHAR,
+            ref_id VARCHAR,
+            user_phone VARCHAR,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            updated_at TIMESTAMP WITH TIME ZONE,
+            callback_url VARCHAR,
+            gateway_token VARCHAR,
+            gateway_url VARCHAR,
+            provider VARCHAR,
+            CONSTRAINT transaction_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute('ALTER SEQUENCE transaction_id_seq OWNED BY "transaction".id')
+    op.execute(f'INSERT INTO "transaction" ({COLUMNS}) SELECT {COLUMNS} FROM transaction_partitioned')
+    op.execute("DROP TABLE transaction_partitioned")
+    _create_indexes(unique_gateway_token=True)
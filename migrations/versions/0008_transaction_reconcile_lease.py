@@ -0,0 +1,22 @@
+"""reconciliation lease on transactions
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nullable with no default, so adding it to the partitioned table doesn't rewrite rows
+    op.add_column("transaction", sa.Column("reconcile_until", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    op.drop_column("transaction", "reconcile_until")
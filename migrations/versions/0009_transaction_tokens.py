@@ -0,0 +1,39 @@
+"""unique gateway tokens across transaction partitions
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+
+Partitioning (0007) made the gateway_token index per partition and
+non-unique. transactiontoken keeps one row per token, keyed on the token,
+and is backfilled from the live rows. Should a token already appear twice,
+only its newest transaction is kept as the target of lookups.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "transactiontoken",
+        sa.Column("gateway_token", sa.String(), primary_key=True),
+        sa.Column("transaction_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_transactiontoken_created_at", "transactiontoken", ["created_at"])
+    op.execute(
+        "INSERT INTO transactiontoken (gateway_token, transaction_id, created_at) "
+        'SELECT DISTINCT ON (gateway_token) gateway_token, id, created_at FROM "transaction" '
+        "WHERE gateway_token IS NOT NULL "
+        "ORDER BY gateway_token, created_at DESC, id DESC"
+    )
+
+
+def downgrade():
+    op.drop_index("ix_transactiontoken_created_at", table_name="transactiontoken")
+    op.drop_table("transactiontoken")
@@ -1,16 +1,41 @@
-from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, DateTime, Index, text
 from sqlalchemy.sql import func
 from db.base_class import Base
 
 class Transaction(Base):
+    # Range-partitioned by month on created_at (migration 0007); the database
+    # primary key is (id, created_at). gateway_token is indexed per partition
+    # only, so its uniqueness is kept by TransactionToken
     id = Column(Integer, primary_key=True, index=True)
     website_id = Column(Integer, ForeignKey("website.id"))
     amount = Column(Numeric(10, 2))
-    status = Column(String, default="pending")  # pending, completed, failed
+    status = Column(String, default="pending")  # pending, completed, failed, expired
     ref_id = Column(String, nullable=True)
     user_phone = Column(String)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     callback_url = Column(String)
-    gateway_token = Column(String, unique=True, nullable=True) 
-    gateway_url = Column(String, nullable=True)
\ No newline at end of file
+    gateway_token = Column(String, index=True, nullable=True)
+    gateway_url = Column(String, nullable=True)
+    provider = Column(String, nullable=True)  # payment account that issued gateway_token; NULL = default
+    reconcile_until = Column(DateTime(timezone=True), nullable=True)  # lease held by the reconciliation worker
+
+    __table_args__ = (
+        # Keyset pagination of a website's history, newest first
+        Index(
+            "ix_transaction_website_created",
+            "website_id", "created_at", "id",
+            postgresql_include=["status", "amount", "ref_id", "gateway_token"]
+        ),
+        Index(
+            "ix_transaction_website_status_created",
+            "website_id", "status", "created_at", "id",
+            postgresql_include=["amount", "ref_id", "gateway_token"]
+        ),
+        # Oldest-first scans of pending rows by the reconciliation worker
+        Index(
+            "ix_transaction_pending_created",
+            "created_at", "id",
+            postgresql_where=text("status = 'pending'")
+        ),
+    )
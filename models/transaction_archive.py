@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from db.base_class import Base
+
+class TransactionArchive(Base):
+    """A transaction partition exported to a compressed file and removed from the table"""
+    id = Column(Integer, primary_key=True, index=True)
+    partition = Column(String, unique=True)
+    range_start = Column(DateTime(timezone=True))
+    range_end = Column(DateTime(timezone=True))
+    path = Column(String)
+    row_count = Column(Integer)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class TransactionArchiveStats(Base):
+    """Per-website totals of archived rows, so statistics still cover them"""
+    id = Column(Integer, primary_key=True, index=True)
+    archive_id = Column(Integer, ForeignKey("transactionarchive.id"))
+    website_id = Column(Integer, index=True)
+    status = Column(String)
+    count = Column(Integer)
+    amount = Column(Numeric(14, 2))
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from db.base_class import Base
+
+class TransactionToken(Base):
+    """
+    Gateway token -> transaction key. `transaction` is partitioned on
+    created_at, so its indexes can't keep gateway_token unique across
+    partitions; this table does, and lookups by token go through it.
+    """
+    gateway_token = Column(String, primary_key=True)
+    transaction_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, index=True)  # archived with its partition
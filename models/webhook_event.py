@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Index, text
+from sqlalchemy.sql import func
+from db.base_class import Base
+
+class WebhookEvent(Base):
+    id = Column(Integer, primary_key=True, index=True)
+    website_id = Column(Integer, ForeignKey("website.id"))
+    transaction_id = Column(Integer)
+    event = Column(String)
+    payload = Column(JSON)
+    status = Column(String, default="pending")  # pending, delivered, failed
+    attempts = Column(Integer, default=0)
+    last_error = Column(String, nullable=True)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    delivered_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Due-event scans by the delivery workers
+        Index(
+            "ix_webhookevent_pending_due",
+            "next_attempt_at",
+            postgresql_where=text("status = 'pending'")
+        ),
+    )
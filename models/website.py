@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ARRAY
+from sqlalchemy import Column, Integer, String, Boolean, ARRAY, JSON
 from db.base_class import Base
 
 class Website(Base):
@@ -6,4 +6,8 @@ class Website(Base):
     domain = Column(String, unique=True, index=True)
     api_key = Column(String, unique=True)
     name = Column(String)
-    is_active = Column(Boolean, default=True)
\ No newline at end of file
+    is_active = Column(Boolean, default=True)
+    rate_limits = Column(JSON, nullable=True)  # {"create": 120, ...} requests per minute
+    webhook_url = Column(String, nullable=True)
+    webhook_secret = Column(String, nullable=True)
+    gateway = Column(String, nullable=True)  # payment account name; NULL = PAYMENT_GATEWAY
@@ -1,9 +1,17 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select, insert, update, tuple_, values, column, String, union_all, or_
+from sqlalchemy.engine import Row, RowMapping
 from models.transaction import Transaction
-from typing import Optional, List
+from models.transaction_archive import TransactionArchiveStats
+from models.transaction_token import TransactionToken
+from typing import Optional, List, Tuple, Dict, AsyncIterator
+from datetime import datetime, timedelta
 from decimal import Decimal
 from sqlalchemy import func
+from services.transaction_cache import transaction_cache, TransactionRecord
+from services.transaction_stats import transaction_stats
+from repositories.webhook import WebhookRepository
+from utils.timing import timed_phase
 
 
 class TransactionRepository:
@@ -17,23 +25,76 @@ class TransactionRepository:
         user_phone: str,
         callback_url: str,
         gateway_token: str,
-        gateway_url: str
+        gateway_url: str,
+        provider: Optional[str] = None
     ) -> Transaction:
-        """Create a new transaction"""
-        transaction = Transaction(
-            amount=amount,
-            website_id=website_id,
-            user_phone=user_phone,
-            callback_url=callback_url,
-            status="pending",
-            gateway_token=gateway_token,
-            gateway_url=gateway_url
-        )
-        self.db.add(transaction)
-        await self.db.commit()
-        await self.db.refresh(transaction)
+        """Create a new transaction with one INSERT ... RETURNING (or through group commit)"""
+        # Imported here to avoid a cycle with the group committer
+        from services.group_commit import group_committer
+
+        row = {
+            "amount": amount,
+            "website_id": website_id,
+            "user_phone": user_phone,
+            "callback_url": callback_url,
+            "status": "pending",
+            "gateway_token": gateway_token,
+            "gateway_url": gateway_url,
+            "provider": provider
+        }
+        if group_committer.running:
+            with timed_phase("db_group_commit"):
+                inserted = await group_committer.insert(row)
+        else:
+            with timed_phase("db_insert"):
+                inserted = (await self.insert_many([row]))[0]
+            with timed_phase("db_commit"):
+                await self.db.commit()
+
+        # Built from what was sent plus the generated columns; not attached to the session
+        transaction = Transaction(id=inserted.id, created_at=inserted.created_at, **row)
+        with timed_phase("cache_write"):
+            await transaction_cache.set(TransactionRecord.from_transaction(transaction))
+            await transaction_stats.record_created(transaction.website_id, transaction.status)
         return transaction
 
+    async def insert_many(self, rows: List[Dict]) -> List[Row]:
+        """
+        Insert transactions in one multi-row INSERT ... RETURNING id, created_at,
+        and their gateway tokens in a second one, which fails on a token
+        already in use. Results are in the order of `rows`. Does not commit.
+        """
+        result = (await self.db.execute(
+            insert(Transaction).returning(
+                Transaction.id,
+                Transaction.created_at,
+                sort_by_parameter_order=True
+            ),
+            rows
+        )).all()
+
+        tokens = [
+            {"gateway_token": row["gateway_token"], "transaction_id": inserted.id, "created_at": inserted.created_at}
+            for row, inserted in zip(rows, result)
+            if row.get("gateway_token")
+        ]
+        if tokens:
+            await self.db.execute(insert(TransactionToken), tokens)
+        return result
+
+    @staticmethod
+    def _has_gateway_token(gateway_tokens: List[str]):
+        """
+        Filter on transactions by gateway token, resolved through the unique
+        token table to their (id, created_at) key so each partition is
+        probed by primary key instead of its gateway_token index.
+        """
+        return tuple_(Transaction.id, Transaction.created_at).in_(
+            select(TransactionToken.transaction_id, TransactionToken.created_at).where(
+                TransactionToken.gateway_token.in_(gateway_tokens)
+            )
+        )
+
     async def get_by_token(self, token: str) -> Optional[Transaction]:
         """Get transaction by token"""
         result = await self.db.execute(
@@ -51,18 +112,172 @@ class TransactionRepository:
         )
         return result.scalars().first()
 
-    async def update_status(self, token: str, status: str, ref_id: Optional[str] = None) -> Optional[Transaction]:
-        """Update transaction status and ref_id"""
+    async def update_status(self, token: str, status: str, ref_id: Optional[str] = None) -> Optional[Row]:
+        """
+        Settle a pending transaction's status and ref_id; returns the updated
+        row with its previous_status, or None if it was no longer pending.
+        """
+        # Imported here to avoid a cycle with the group committer
+        from services.group_commit import group_committer
+
+        if group_committer.running:
+            with timed_phase("db_group_commit"):
+                row = await group_committer.update_status(token, status, ref_id)
+        else:
+            with timed_phase("db_update"):
+                row = (await self.update_status_many([(token, status, ref_id)])).get(token)
+            with timed_phase("db_commit"):
+                await self.db.commit()
+        if row is None:
+            return None
+
+        with timed_phase("cache_write"):
+            await transaction_cache.set(TransactionRecord.from_transaction(row))
+            await transaction_stats.record_status_change(
+                row.website_id, row.previous_status, row.status, row.amount
+            )
+        return row
+
+    async def update_status_many(self, changes: List[Tuple[str, str, Optional[str]]]) -> Dict[str, Row]:
+        """
+        Apply (gateway_token, status, ref_id) changes in one UPDATE ... RETURNING,
+        locking the rows first to capture their previous status, and queue the
+        merchant webhooks. Only pending transactions change, so an outcome
+        settled concurrently is never overwritten. Each token may appear once.
+        Does not commit. Returns the updated rows by gateway token.
+        """
+        if not changes:
+            return {}
+
+        data = values(
+            column("gateway_token", String),
+            column("status", String),
+            column("ref_id", String),
+            name="data"
+        ).data(changes)
+
+        # Lock the rows and capture their previous status for the stats counters
+        previous = select(
+            Transaction.id,
+            Transaction.created_at,
+            Transaction.status
+        ).where(
+            self._has_gateway_token([token for token, _, _ in changes]),
+            Transaction.status == "pending"
+        ).with_for_update(of=Transaction).cte("previous")
+
         query = update(Transaction).where(
-            Transaction.gateway_token == token
+            Transaction.id == previous.c.id,
+            Transaction.created_at == previous.c.created_at,
+            Transaction.gateway_token == data.c.gateway_token,
+            Transaction.status == "pending"
         ).values(
-            status=status,
-            ref_id=ref_id
-        ).returning(Transaction)
-        
-        result = await self.db.execute(query)
+            status=data.c.status,
+            ref_id=data.c.ref_id
+        ).returning(
+            Transaction.id,
+            Transaction.website_id,
+            Transaction.gateway_token,
+            Transaction.callback_url,
+            Transaction.gateway_url,
+            Transaction.amount,
+            Transaction.status,
+            Transaction.ref_id,
+            previous.c.status.label("previous_status")
+        ).execution_options(synchronize_session=False)
+
+        rows = (await self.db.execute(query)).all()
+        # Queue merchant webhooks in the same transaction as the changes
+        await WebhookRepository(self.db).enqueue_status_changes(
+            (row, row.previous_status) for row in rows
+        )
+        return {row.gateway_token: row for row in rows}
+
+    async def get_by_gateway_tokens(self, gateway_tokens: List[str]) -> List[Transaction]:
+        """Get several transactions by gateway token in one query"""
+        if not gateway_tokens:
+            return []
+        result = await self.db.execute(
+            select(Transaction).where(self._has_gateway_token(gateway_tokens))
+        )
+        return result.scalars().all()
+
+    async def apply_status_changes(self, changes: List[Tuple[str, str, Optional[str]]]) -> Dict[str, Row]:
+        """
+        Settle several pending transactions with update_status_many and one
+        commit, then refresh their cache entries and stats counters. Tokens
+        that were no longer pending are left out of the result.
+        """
+        rows = await self.update_status_many(changes)
+        await self.db.commit()
+
+        for row in rows.values():
+            await transaction_cache.set(TransactionRecord.from_transaction(row))
+            await transaction_stats.record_status_change(
+                row.website_id, row.previous_status, row.status, row.amount
+            )
+        return rows
+
+    async def lease_pending(
+        self,
+        created_before: datetime,
+        limit: int,
+        lease_seconds: int,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> List[Row]:
+        """
+        Lease a batch of old pending transactions, oldest first, by setting
+        reconcile_until and committing, so no row lock or connection is held
+        while they are verified. Rows leased by another worker are skipped;
+        if a worker dies its leases expire after `lease_seconds`.
+        """
+        due = select(Transaction.id, Transaction.created_at).where(
+            Transaction.status == "pending",
+            Transaction.created_at < created_before,
+            or_(Transaction.reconcile_until.is_(None), Transaction.reconcile_until < func.now())
+        )
+
+        if after:
+            due = due.where(
+                tuple_(Transaction.created_at, Transaction.id) > tuple_(*after)
+            )
+
+        due = due.order_by(
+            Transaction.created_at,
+            Transaction.id
+        ).limit(limit).with_for_update(skip_locked=True)
+
+        result = await self.db.execute(
+            update(Transaction).where(
+                tuple_(Transaction.id, Transaction.created_at).in_(due)
+            ).values(
+                reconcile_until=func.now() + timedelta(seconds=lease_seconds)
+            ).returning(
+                Transaction.id,
+                Transaction.website_id,
+                Transaction.gateway_token,
+                Transaction.amount,
+                Transaction.provider,
+                Transaction.created_at
+            ).execution_options(synchronize_session=False)
+        )
+        rows = result.all()
+        await self.db.commit()
+        return sorted(rows, key=lambda row: (row.created_at, row.id))
+
+    async def release_leases(self, gateway_tokens: List[str]):
+        """Clear the reconciliation lease of transactions that stay pending"""
+        if not gateway_tokens:
+            return
+        await self.db.execute(
+            update(Transaction).where(
+                self._has_gateway_token(gateway_tokens),
+                Transaction.status == "pending"
+            ).values(
+                reconcile_until=None
+            ).execution_options(synchronize_session=False)
+        )
         await self.db.commit()
-        return result.scalars().first()
 
     async def get_website_transactions(
         self,
@@ -74,40 +289,164 @@ class TransactionRepository:
         """Get all transactions for a website with optional status filter"""
         query = select(Transaction).where(
             Transaction.website_id == website_id
-        ).order_by(
-            Transaction.created_at.desc()
-        ).limit(limit).offset(offset)
+        ).execution_options(use_replica=True)
         
         if status:
             query = query.where(Transaction.status == status)
+
+        query = query.order_by(
+            Transaction.created_at.desc()
+        ).limit(limit).offset(offset)
             
         result = await self.db.execute(query)
         return result.scalars().all()
 
-    async def get_transaction_stats(self, website_id: int):
-        """Get transaction statistics for a website"""
-        
-        # Total amount of successful transactions
-        total_amount_query = select(func.sum(Transaction.amount)).where(
-            Transaction.website_id == website_id,
-            Transaction.status == "completed"
-        )
-        
-        # Count of transactions by status
-        status_count_query = select(
+    async def list_website_transactions(
+        self,
+        website_id: int,
+        status: Optional[str] = None,
+        limit: int = 50,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> List[RowMapping]:
+        """
+        Keyset-paginated listing of a website's transactions, newest first.
+        `after` is the (created_at, id) of the last row of the previous page.
+        Returns projected rows served by the covering listing indexes.
+        """
+        query = select(
+            Transaction.id,
+            Transaction.gateway_token,
+            Transaction.amount,
             Transaction.status,
-            func.count(Transaction.id)
+            Transaction.ref_id,
+            Transaction.created_at
         ).where(
             Transaction.website_id == website_id
-        ).group_by(Transaction.status)
-        
-        total_amount = await self.db.execute(total_amount_query)
-        status_counts = await self.db.execute(status_count_query)
-        
-        return {
-            "total_amount": total_amount.scalar() or 0,
-            "status_counts": dict(status_counts.all())
-        }
+        ).execution_options(use_replica=True)
+
+        if status:
+            query = query.where(Transaction.status == status)
+
+        if after:
+            query = query.where(
+                tuple_(Transaction.created_at, Transaction.id) < tuple_(*after)
+            )
+
+        query = query.order_by(
+            Transaction.created_at.desc(),
+            Transaction.id.desc()
+        ).limit(limit)
+
+        result = await self.db.execute(query)
+        return result.mappings().all()
+
+    async def stream_website_transactions(
+        self,
+        website_id: int,
+        status: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        chunk_size: int = 1000
+    ) -> AsyncIterator[List[RowMapping]]:
+        """
+        A website's transactions, oldest first, in chunks of `chunk_size`
+        rows read from a server-side cursor so memory use doesn't grow with
+        the size of the export. `created_to` is exclusive.
+        """
+        query = select(
+            Transaction.id,
+            Transaction.gateway_token,
+            Transaction.amount,
+            Transaction.status,
+            Transaction.ref_id,
+            Transaction.user_phone,
+            Transaction.created_at,
+            Transaction.updated_at
+        ).where(
+            Transaction.website_id == website_id
+        )
+
+        if status:
+            query = query.where(Transaction.status == status)
+        if created_from:
+            query = query.where(Transaction.created_at >= created_from)
+        if created_to:
+            query = query.where(Transaction.created_at < created_to)
+
+        query = query.order_by(
+            Transaction.created_at,
+            Transaction.id
+        ).execution_options(use_replica=True, yield_per=chunk_size)
+
+        result = await self.db.stream(query)
+        async for rows in result.mappings().partitions():
+            yield rows
+
+    async def get_transaction_stats(self, website_id: int):
+        """Get transaction statistics for a website from the live counters"""
+        stats = await transaction_stats.get(website_id)
+        if stats is not None:
+            return stats
+
+        # Not seeded yet: collect changes, aggregate and store both together
+        token = await transaction_stats.begin_seed(website_id)
+        stats = await self.aggregate_stats(website_id)
+        await transaction_stats.store(website_id, stats, token)
+        return stats
+
+    @staticmethod
+    def _stats_query(website_id: Optional[int] = None):
+        """
+        (website_id, status, count, amount) over live rows and archived
+        partitions. Read from the primary: the result seeds the live counters,
+        which must not start behind the replica's lag.
+        """
+        live = select(
+            Transaction.website_id,
+            Transaction.status,
+            func.count(Transaction.id).label("count"),
+            func.sum(Transaction.amount).label("amount")
+        ).group_by(Transaction.website_id, Transaction.status)
+        archived = select(
+            TransactionArchiveStats.website_id,
+            TransactionArchiveStats.status,
+            TransactionArchiveStats.count,
+            TransactionArchiveStats.amount
+        )
+        if website_id is not None:
+            live = live.where(Transaction.website_id == website_id)
+            archived = archived.where(TransactionArchiveStats.website_id == website_id)
+
+        combined = union_all(live, archived).subquery()
+        return select(
+            combined.c.website_id,
+            combined.c.status,
+            func.sum(combined.c.count),
+            func.sum(combined.c.amount)
+        ).group_by(
+            combined.c.website_id,
+            combined.c.status
+        )
+
+    async def aggregate_stats(self, website_id: int):
+        """Compute transaction statistics for a website from the table"""
+        stats = await self._aggregate(website_id)
+        return stats.get(website_id, {"total_amount": 0, "status_counts": {}})
+
+    async def aggregate_all_stats(self) -> Dict[int, Dict]:
+        """Compute statistics for every website in one pass, used for reconciliation"""
+        return await self._aggregate()
+
+    async def _aggregate(self, website_id: Optional[int] = None) -> Dict[int, Dict]:
+        result = await self.db.execute(self._stats_query(website_id))
+
+        stats: Dict[int, Dict] = {}
+        for website_id, status, count, amount in result.all():
+            website_stats = stats.setdefault(website_id, {"total_amount": 0, "status_counts": {}})
+            website_stats["status_counts"][status] = int(count)
+            if status == "completed":
+                website_stats["total_amount"] = amount or 0
+        return stats
 
     async def update_gateway_token(self, token: str, gateway_token: str) -> Optional[Transaction]:
         """Update transaction's gateway token"""
@@ -121,9 +460,12 @@ class TransactionRepository:
         await self.db.commit()
         return result.scalars().first()
 
-    async def get_by_gateway_token(self, gateway_token: str) -> Optional[Transaction]:
-        """Get transaction by gateway token"""
-        result = await self.db.execute(
-            select(Transaction).where(Transaction.gateway_token == gateway_token)
-        )
+    async def get_by_gateway_token(self, gateway_token: str, use_replica: bool = True) -> Optional[Transaction]:
+        """Get transaction by gateway token; pass use_replica=False to read your own writes"""
+        with timed_phase("db_select"):
+            result = await self.db.execute(
+                select(Transaction).where(
+                    self._has_gateway_token([gateway_token])
+                ).execution_options(use_replica=use_replica)
+            )
         return result.scalars().first() 
\ No newline at end of file
@@ -0,0 +1,130 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, insert, func
+from models.webhook_event import WebhookEvent
+from models.website import Website
+from typing import Optional, List, Tuple, Dict, Iterable
+from datetime import datetime, timedelta, timezone
+
+STATUS_CHANGED = "transaction.status_changed"
+
+
+class WebhookRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def enqueue_status_changes(self, changes: Iterable[Tuple[object, str]]):
+        """
+        Queue a status-change event for every (transaction, previous_status)
+        whose website has a webhook. Does not commit: callers add the events to
+        the same transaction as the status update so none are lost.
+        """
+        changes = [
+            (transaction, previous_status)
+            for transaction, previous_status in changes
+            if transaction.status != previous_status
+        ]
+        if not changes:
+            return
+
+        result = await self.db.execute(
+            select(Website.id).where(
+                Website.id.in_({transaction.website_id for transaction, _ in changes}),
+                Website.webhook_url.isnot(None)
+            )
+        )
+        hooked = set(result.scalars().all())
+        if not hooked:
+            return
+
+        occurred_at = datetime.now(timezone.utc).isoformat()
+        rows = [
+            {
+                "website_id": transaction.website_id,
+                "transaction_id": transaction.id,
+                "event": STATUS_CHANGED,
+                "status": "pending",
+                "attempts": 0,
+                "payload": {
+                    "event": STATUS_CHANGED,
+                    "authority": transaction.gateway_token,
+                    "status": transaction.status,
+                    "previous_status": previous_status,
+                    "ref_id": transaction.ref_id,
+                    "amount": str(transaction.amount),
+                    "occurred_at": occurred_at
+                }
+            }
+            for transaction, previous_status in changes
+            if transaction.website_id in hooked
+        ]
+        if rows:
+            await self.db.execute(insert(WebhookEvent), rows)
+
+    async def claim_due(
+        self,
+        limit: int,
+        lease_seconds: int,
+        exclude_websites: Iterable[int] = ()
+    ) -> List[WebhookEvent]:
+        """
+        Lease due events by pushing their next_attempt_at forward. If a worker
+        dies mid-delivery the event becomes due again once the lease expires.
+        """
+        due = select(WebhookEvent.id).where(
+            WebhookEvent.status == "pending",
+            WebhookEvent.next_attempt_at <= func.now()
+        )
+        exclude_websites = list(exclude_websites)
+        if exclude_websites:
+            due = due.where(WebhookEvent.website_id.notin_(exclude_websites))
+        due = due.order_by(
+            WebhookEvent.next_attempt_at
+        ).limit(limit).with_for_update(skip_locked=True).scalar_subquery()
+
+        result = await self.db.execute(
+            update(WebhookEvent).where(
+                WebhookEvent.id.in_(due)
+            ).values(
+                next_attempt_at=func.now() + timedelta(seconds=lease_seconds)
+            ).returning(WebhookEvent).execution_options(synchronize_session=False)
+        )
+        events = result.scalars().all()
+        await self.db.commit()
+        return events
+
+    async def get_targets(self, website_ids: Iterable[int]) -> Dict[int, Tuple[str, Optional[str]]]:
+        """Map website id -> (webhook_url, webhook_secret)"""
+        result = await self.db.execute(
+            select(Website.id, Website.webhook_url, Website.webhook_secret).where(
+                Website.id.in_(set(website_ids)),
+                Website.webhook_url.isnot(None)
+            )
+        )
+        return {website_id: (url, secret) for website_id, url, secret in result.all()}
+
+    async def mark_delivered(self, event_id: int):
+        await self.db.execute(
+            update(WebhookEvent).where(
+                WebhookEvent.id == event_id
+            ).values(
+                status="delivered",
+                attempts=WebhookEvent.attempts + 1,
+                delivered_at=func.now(),
+                last_error=None
+            )
+        )
+        await self.db.commit()
+
+    async def mark_failed_attempt(self, event_id: int, error: str, retry_at: Optional[datetime]):
+        """Schedule a retry at `retry_at`, or give up when it is None"""
+        await self.db.execute(
+            update(WebhookEvent).where(
+                WebhookEvent.id == event_id
+            ).values(
+                status="pending" if retry_at else "failed",
+                attempts=WebhookEvent.attempts + 1,
+                last_error=error[:500],
+                next_attempt_at=retry_at or func.now()
+            )
+        )
+        await self.db.commit()
@@ -2,16 +2,22 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from models.website import Website
 from typing import Optional
+from services.api_key_cache import api_key_cache
+from utils.timing import timed_phase
 
 class WebsiteRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
     
     async def get_by_api_key(self, api_key: str) -> Optional[Website]:
-        result = await self.db.execute(
-            select(Website).where(Website.api_key == api_key, Website.is_active == True)
-        )
+        with timed_phase("db_api_key"):
+            result = await self.db.execute(
+                select(Website).where(Website.api_key == api_key, Website.is_active == True)
+            )
         return result.scalars().first()
+
+    async def get(self, website_id: int) -> Optional[Website]:
+        return await self.db.get(Website, website_id)
     
     async def create(self, domain: str, name: str) -> Website:
         import secrets
@@ -25,4 +31,50 @@ class WebsiteRepository:
         self.db.add(website)
         await self.db.commit()
         await self.db.refresh(website)
-        return website 
\ No newline at end of file
+        # Clear any negative cache entry left by earlier lookups of this key
+        await api_key_cache.invalidate(api_key)
+        return website
+
+    async def update(self, website_id: int, **values) -> Optional[Website]:
+        """Update website fields and invalidate its cached API key entries"""
+        website = await self.get(website_id)
+        if not website:
+            return None
+
+        old_api_key = website.api_key
+        for field, value in values.items():
+            setattr(website, field, value)
+
+        await self.db.commit()
+        await self.db.refresh(website)
+        await api_key_cache.invalidate(old_api_key, website.api_key)
+        return website
+
+    async def set_active(self, website_id: int, is_active: bool) -> Optional[Website]:
+        return await self.update(website_id, is_active=is_active)
+
+    async def rotate_api_key(self, website_id: int) -> Optional[Website]:
+        import secrets
+        return await self.update(website_id, api_key=secrets.token_urlsafe(32))
+
+    async def set_webhook(self, website_id: int, webhook_url: Optional[str]) -> Optional[Website]:
+        """
+        Set or clear the website's webhook URL, issuing a new signing secret.
+        The URL must be https and resolve only to public addresses.
+        """
+        import secrets
+        from utils.http import resolve_public_url
+        if webhook_url is not None:
+            await resolve_public_url(webhook_url)
+        return await self.update(
+            website_id,
+            webhook_url=webhook_url,
+            webhook_secret=secrets.token_urlsafe(32) if webhook_url else None
+        )
+
+    async def set_gateway(self, website_id: int, gateway: Optional[str]) -> Optional[Website]:
+        """Route the website's new payments through payment account `gateway` (None = default)"""
+        from services.payment.factory import provider_registry
+        if gateway is not None and gateway not in provider_registry.names():
+            raise ValueError(f"Payment account {gateway} not configured")
+        return await self.update(website_id, gateway=gateway)
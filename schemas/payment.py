@@ -1,6 +1,7 @@
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, HttpUrl, Field
 from decimal import Decimal
-from typing import Optional
+from typing import Optional, List
+from core.config import settings
 
 class PaymentCreate(BaseModel):
     amount: Decimal
@@ -11,4 +12,19 @@ class PaymentCreate(BaseModel):
 class PaymentCreateResponse(BaseModel):
     status: bool
     token: str
-    payment_url: str  # URL for redirecting to payment page 
\ No newline at end of file
+    payment_url: str  # URL for redirecting to payment page
+
+
+class PaymentBatchVerify(BaseModel):
+    authorities: List[str] = Field(..., min_length=1, max_length=settings.BATCH_VERIFY_MAX_ITEMS)
+
+
+class PaymentVerifyItem(BaseModel):
+    authority: str
+    status: bool
+    ref_id: Optional[str] = None
+    message: Optional[str] = None
+
+
+class PaymentBatchVerifyResponse(BaseModel):
+    results: List[PaymentVerifyItem]
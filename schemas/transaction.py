@@ -1,7 +1,7 @@
 from pydantic import BaseModel
 from decimal import Decimal
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 
 class TransactionBase(BaseModel):
     amount: Decimal
@@ -25,4 +25,16 @@ class Transaction(TransactionBase):
 
 class TransactionStats(BaseModel):
     total_amount: Decimal
-    status_counts: dict[str, int] 
\ No newline at end of file
+    status_counts: dict[str, int]
+
+class TransactionListItem(BaseModel):
+    id: int
+    gateway_token: Optional[str]
+    amount: Decimal
+    status: str
+    ref_id: Optional[str] = None
+    created_at: datetime
+
+class TransactionListResponse(BaseModel):
+    items: List[TransactionListItem]
+    next_cursor: Optional[str] = None
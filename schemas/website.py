@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class WebhookUpdate(BaseModel):
+    webhook_url: Optional[str] = None  # None disables webhooks
+
+
+class WebhookUpdateResponse(BaseModel):
+    website_id: int
+    webhook_url: Optional[str] = None
+    webhook_secret: Optional[str] = None  # merchants verify X-Webhook-Signature with it
@@ -0,0 +1,158 @@
+"""
+Production server: `python -m serve`.
+
+Runs the app under gunicorn with uvicorn workers. The app is imported once
+in the master (preload) and forked into the workers; each worker then runs
+the FastAPI lifespan itself, so database, Redis and HTTP pools, caches and
+background tasks belong to the worker that uses them. Falls back to
+uvicorn's own multi-process mode when gunicorn is not installed.
+"""
+import argparse
+import importlib.util
+import logging
+import os
+import shutil
+import tempfile
+from core.config import settings
+
+log = logging.getLogger("serve")
+
+
+def _has(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+LOOP = "uvloop" if _has("uvloop") else "asyncio"
+HTTP = "httptools" if _has("httptools") else "h11"
+
+
+def default_workers() -> int:
+    """One worker per CPU this process may run on, capped at SERVER_MAX_WORKERS"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    return max(1, min(cpus, settings.SERVER_MAX_WORKERS))
+
+
+def _prepare_metrics_dir(workers: int):
+    """Point prometheus_client at a clean shared directory before any metric is created"""
+    if workers <= 1:
+        return
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path = tempfile.mkdtemp(prefix="prometheus-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    os.makedirs(path, exist_ok=True)
+
+
+def post_fork(server, worker):
+    # The log writer thread doesn't survive fork, and any pooled connection
+    # inherited from the master must not be shared; start a new writer and
+    # drop the pools without closing the master's sockets
+    from utils.logger import restart_logging
+    from db.session import engine, replica_engine
+
+    restart_logging()
+    engine.sync_engine.dispose(close=False)
+    if replica_engine is not None:
+        replica_engine.sync_engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def run_gunicorn(bind: str, workers: int):
+    from gunicorn.app.base import BaseApplication
+    from uvicorn.workers import UvicornWorker
+
+    class GatewayWorker(UvicornWorker):
+        CONFIG_KWARGS = {
+            "loop": LOOP,
+            "http": HTTP,
+            # Fail the worker when startup fails instead of serving without pools
+            "lifespan": "on",
+            "server_header": False,
+            "limit_concurrency": settings.SERVER_LIMIT_CONCURRENCY,
+        }
+
+    class GatewayApplication(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": bind,
+                "workers": workers,
+                "worker_class": GatewayWorker,
+                "preload_app": True,
+                "backlog": settings.SERVER_BACKLOG,
+                "keepalive": settings.SERVER_KEEPALIVE,
+                "timeout": settings.SERVER_TIMEOUT,
+                "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT,
+                "max_requests": settings.SERVER_MAX_REQUESTS,
+                "max_requests_jitter": settings.SERVER_MAX_REQUESTS_JITTER,
+                "post_fork": post_fork,
+                "child_exit": child_exit,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from main import app
+            return app
+
+    GatewayApplication().run()
+
+
+def run_uvicorn(host: str, port: int, workers: int):
+    import uvicorn
+
+    # uvicorn spawns fresh interpreters, so there is nothing to preload
+    uvicorn.run(
+        "main:app",
+        host=host,
+        port=port,
+        workers=workers,
+        loop=LOOP,
+        http=HTTP,
+        lifespan="on",
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+        limit_concurrency=settings.SERVER_LIMIT_CONCURRENCY,
+        limit_max_requests=settings.SERVER_MAX_REQUESTS or None,
+        server_header=False,
+        access_log=False,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the payment gateway proxy in production mode")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS,
+                        help="0 sizes the pool from the available CPUs")
+    args = parser.parse_args()
+
+    workers = args.workers or default_workers()
+    _prepare_metrics_dir(workers)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    log.info(
+        "Starting %s workers on %s:%s (loop=%s, http=%s); up to %s database connections per engine",
+        workers, args.host, args.port, LOOP, HTTP,
+        workers * (settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW)
+    )
+
+    if _has("gunicorn"):
+        run_gunicorn(f"{args.host}:{args.port}", workers)
+    else:
+        log.warning("gunicorn is not installed; using uvicorn workers without app preloading")
+        run_uvicorn(args.host, args.port, workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+from dataclasses import dataclass, asdict
+from typing import Optional, Dict, Any
+from core.config import settings
+from utils.cache import TTLCache
+from utils.logger import logger
+from utils.redis import redis
+
+INVALIDATION_CHANNEL = "website:invalidate"
+# An idle read returns None after this long instead of tripping the socket timeout
+LISTEN_POLL_SECONDS = min(1.0, settings.REDIS_SOCKET_TIMEOUT / 2)
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class WebsiteRecord:
+    """Compact, session-independent view of an active website"""
+    id: int
+    domain: str
+    name: Optional[str] = None
+    rate_limits: Optional[Dict[str, Any]] = None
+    gateway: Optional[str] = None
+
+
+class ApiKeyCache:
+    """
+    Two-tier cache for API key -> website lookups.
+
+    The first tier is a per-process TTL/LRU cache, the second is Redis.
+    Unknown or inactive keys are cached as negative entries with a shorter
+    TTL so repeated bad keys never reach Postgres.
+    """
+
+    def __init__(self):
+        self.local = TTLCache(
+            maxsize=settings.API_KEY_CACHE_MAXSIZE,
+            ttl=settings.API_KEY_CACHE_TTL
+        )
+        self.redis_hits = 0
+        self.db_loads = 0
+        self.negative_hits = 0
+        self._listener: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _digest(api_key: str) -> str:
+        return hashlib.sha256(api_key.encode()).hexdigest()
+
+    @staticmethod
+    def _redis_key(digest: str) -> str:
+        return f"apikey:{digest}"
+
+    def _remember(self, digest: str, record: Optional[WebsiteRecord]):
+        ttl = settings.API_KEY_CACHE_TTL if record else settings.API_KEY_CACHE_NEGATIVE_TTL
+        self.local.set(digest, record, ttl=ttl)
+
+    async def get_website(self, api_key: str, website_repo) -> Optional[WebsiteRecord]:
+        """Resolve an API key, falling back to Redis and then the database"""
+        digest = self._digest(api_key)
+
+        record = self.local.get(digest, _MISSING)
+        if record is not _MISSING:
+            if record is None:
+                self.negative_hits += 1
+            return record
+
+        try:
+            cached = await redis.get(self._redis_key(digest))
+        except Exception as e:
+            logger.warning("API key cache Redis read failed: %s", e)
+            cached = None
+
+        if isinstance(cached, dict):
+            self.redis_hits += 1
+            record = WebsiteRecord(**cached["website"]) if cached.get("website") else None
+            if record is None:
+                self.negative_hits += 1
+            self._remember(digest, record)
+            return record
+
+        self.db_loads += 1
+        website = await website_repo.get_by_api_key(api_key)
+        record = WebsiteRecord(
+            id=website.id,
+            domain=website.domain,
+            name=website.name,
+            rate_limits=website.rate_limits,
+            gateway=website.gateway
+        ) if website else None
+
+        self._remember(digest, record)
+        try:
+            await redis.set(
+                self._redis_key(digest),
+                {"website": asdict(record) if record else None},
+                expire=settings.API_KEY_CACHE_TTL if record else settings.API_KEY_CACHE_NEGATIVE_TTL
+            )
+        except Exception as e:
+            logger.warning("API key cache Redis write failed: %s", e)
+
+        return record
+
+    async def invalidate(self, *api_keys: str):
+        """Drop entries locally, in Redis and on every other replica"""
+        for api_key in api_keys:
+            if not api_key:
+                continue
+            digest = self._digest(api_key)
+            self.local.delete(digest)
+            try:
+                await redis.delete(self._redis_key(digest))
+                await redis.publish(INVALIDATION_CHANNEL, digest)
+            except Exception as e:
+                logger.warning("API key cache invalidation failed: %s", e)
+
+    async def _consume(self):
+        pubsub = await redis.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            while True:
+                # Poll with a read timeout below REDIS_SOCKET_TIMEOUT: listen()
+                # would hit the socket timeout whenever the channel is idle
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=LISTEN_POLL_SECONDS)
+                if message is None or message.get("type") != "message":
+                    continue
+                digest = message["data"]
+                if isinstance(digest, bytes):
+                    digest = digest.decode()
+                self.local.delete(digest)
+        finally:
+            # Give the subscription's connection back to the pool, also on cancel
+            try:
+                await pubsub.aclose()
+            except Exception as e:
+                logger.warning("API key invalidation listener close failed: %s", e)
+
+    async def _listen(self):
+        while True:
+            try:
+                await self._consume()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("API key invalidation listener error: %s", e)
+                self.local.clear()
+                await asyncio.sleep(1)
+
+    def start(self):
+        """Start the cross-replica invalidation listener"""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def stats(self) -> Dict[str, int]:
+        local = self.local.stats()
+        return {
+            "size": local["size"],
+            "local_hits": local["hits"],
+            "local_misses": local["misses"],
+            "redis_hits": self.redis_hits,
+            "db_loads": self.db_loads,
+            "negative_hits": self.negative_hits
+        }
+
+
+api_key_cache = ApiKeyCache()
@@ -0,0 +1,80 @@
+import csv
+import io
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+from core.config import settings
+from db.session import async_session
+from repositories.transaction import TransactionRepository
+from utils.logger import logger
+from utils.serialization import dumps
+
+EXPORT_COLUMNS = (
+    "id", "gateway_token", "amount", "status", "ref_id", "user_phone", "created_at", "updated_at"
+)
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _encode_csv(rows: List, header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow([
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in (row[column] for column in EXPORT_COLUMNS)
+        ])
+    return buffer.getvalue().encode()
+
+
+def _encode_ndjson(rows: List) -> bytes:
+    return b"".join(dumps(dict(row)) + b"\n" for row in rows)
+
+
+async def export_transactions(
+    website_id: int,
+    fmt: str,
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None
+) -> AsyncIterator[bytes]:
+    """
+    Yield a website's transactions as gzip-compressed CSV or NDJSON.
+
+    Opens its own session because the response body is produced after the
+    request's dependencies have been closed. Rows are read from a server-side
+    cursor and compressed chunk by chunk, so memory stays flat.
+    """
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(settings.EXPORT_COMPRESSION_LEVEL, zlib.DEFLATED, 31)
+    exported = 0
+
+    if fmt == "csv":
+        yield compressor.compress(_encode_csv([], header=True))
+
+    try:
+        async with async_session() as db:
+            chunks = TransactionRepository(db).stream_website_transactions(
+                website_id=website_id,
+                status=status,
+                created_from=created_from,
+                created_to=created_to,
+                chunk_size=settings.EXPORT_CHUNK_ROWS
+            )
+            async for rows in chunks:
+                data = _encode_csv(rows) if fmt == "csv" else _encode_ndjson(rows)
+                exported += len(rows)
+                compressed = compressor.compress(data)
+                if compressed:
+                    yield compressed
+    except Exception:
+        # Headers are already sent; a truncated gzip stream tells the client it failed
+        logger.exception("Transaction export failed for website %s after %s rows", website_id, exported)
+        raise
+
+    yield compressor.flush()
+    logger.info("Exported %s transactions for website %s", exported, website_id)
@@ -0,0 +1,146 @@
+import asyncio
+from typing import Dict, List, Optional, Tuple
+from core.config import settings
+from db.session import async_session
+from utils.logger import logger
+
+INSERT = "insert"
+UPDATE = "update"
+
+
+class GroupCommitter:
+    """
+    Group commit for transaction writes.
+
+    Requests hand their INSERT or status UPDATE to a queue and wait. A few
+    flusher tasks each take everything queued (up to DB_GROUP_COMMIT_MAX_BATCH,
+    optionally waiting DB_GROUP_COMMIT_WINDOW_MS for more), write all inserts
+    with one multi-row INSERT and all updates with one UPDATE, commit once,
+    and only then resolve each caller's future. If a batch fails its
+    operations are retried one by one so a single bad row fails only its
+    own request.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def insert(self, row: Dict):
+        """Insert a transaction; resolves to its (id, created_at) once committed"""
+        return await self._submit(INSERT, row)
+
+    async def update_status(self, token: str, status: str, ref_id: Optional[str] = None):
+        """Update a status; resolves to the updated row (or None) once committed"""
+        return await self._submit(UPDATE, (token, status, ref_id))
+
+    async def _submit(self, kind: str, payload):
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((kind, payload, future))
+        return await future
+
+    async def _collect(self) -> Tuple[List[tuple], bool]:
+        """Wait for one operation, then take whatever else is queued; returns (batch, stop)"""
+        item = await self._queue.get()
+        if item is None:
+            return [], True
+
+        batch = [item]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.DB_GROUP_COMMIT_WINDOW_MS / 1000
+        while len(batch) < settings.DB_GROUP_COMMIT_MAX_BATCH:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _write(self, batch: List[tuple]) -> List:
+        # Imported here to avoid a cycle with the repository module
+        from repositories.transaction import TransactionRepository
+
+        results: List = [None] * len(batch)
+        async with async_session() as db:
+            repo = TransactionRepository(db)
+
+            inserts = [i for i, (kind, _, _) in enumerate(batch) if kind == INSERT]
+            if inserts:
+                rows = await repo.insert_many([batch[i][1] for i in inserts])
+                for i, row in zip(inserts, rows):
+                    results[i] = row
+
+            # A token may be updated only once per statement; later updates of
+            # the same token go in a following statement of the same transaction
+            pending = [i for i, (kind, _, _) in enumerate(batch) if kind == UPDATE]
+            while pending:
+                seen, current, deferred = set(), [], []
+                for i in pending:
+                    token = batch[i][1][0]
+                    (deferred if token in seen else current).append(i)
+                    seen.add(token)
+                updated = await repo.update_status_many([batch[i][1] for i in current])
+                for i in current:
+                    results[i] = updated.get(batch[i][1][0])
+                pending = deferred
+
+            await db.commit()
+        return results
+
+    async def _flush(self, batch: List[tuple]):
+        try:
+            results = await self._write(batch)
+        except Exception as e:
+            if len(batch) > 1:
+                logger.warning("Group commit of %s operations failed, retrying individually: %s", len(batch), e)
+                for item in batch:
+                    await self._flush([item])
+                return
+            future = batch[0][2]
+            if not future.done():
+                future.set_exception(e)
+            return
+
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _run(self):
+        while True:
+            batch, stop = await self._collect()
+            if batch:
+                await self._flush(batch)
+            if stop:
+                return
+
+    def start(self):
+        if not settings.DB_GROUP_COMMIT_ENABLED or self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._run())
+            for _ in range(settings.DB_GROUP_COMMIT_WORKERS)
+        ]
+
+    async def stop(self):
+        """Flush everything already queued, then stop the workers"""
+        if not self.running:
+            return
+        workers, self._workers = self._workers, []
+        for _ in workers:
+            self._queue.put_nowait(None)
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+group_committer = GroupCommitter()
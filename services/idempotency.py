@@ -0,0 +1,142 @@
+import asyncio
+import hashlib
+import time
+from decimal import Decimal
+from typing import Awaitable, Callable, Dict
+from fastapi import HTTPException
+from redis.exceptions import RedisError
+from core.config import settings
+from utils.logger import logger
+from utils.redis import redis, RedisNotConnectedError, RedisSerializationError
+
+IN_FLIGHT = "in_flight"
+DONE = "done"
+
+# Includes values this client can't read, e.g. written before the msgpack format
+STORE_ERRORS = (RedisError, RedisNotConnectedError, RedisSerializationError)
+
+
+class IdempotencyStore:
+    """
+    Replays the first response for a repeated Idempotency-Key.
+
+    The first request claims the key in Redis with SET NX and stores its
+    response when it finishes. Duplicates in the same process await the
+    in-flight call directly; duplicates on other replicas poll Redis until the
+    response is stored. A failed request releases the key so it can be retried.
+    When the claim can't be checked in Redis the request is refused with 503
+    rather than run without its duplicate protection.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def _redis_key(scope: str, key: str) -> str:
+        digest = hashlib.sha256(f"{scope}:{key}".encode()).hexdigest()
+        return f"idem:{digest}"
+
+    @staticmethod
+    def _canonical(part) -> str:
+        # Equal amounts must match however they were written ("1000" vs "1000.00")
+        if isinstance(part, Decimal):
+            return f"{part.normalize():f}"
+        return str(part)
+
+    @classmethod
+    def fingerprint(cls, *parts) -> str:
+        return hashlib.sha256("|".join(cls._canonical(part) for part in parts).encode()).hexdigest()
+
+    @staticmethod
+    def _unavailable(e: Exception) -> HTTPException:
+        logger.error("Idempotency store unavailable: %s", e)
+        return HTTPException(status_code=503, detail="Idempotency store unavailable, retry later")
+
+    @staticmethod
+    async def _release(redis_key: str):
+        try:
+            await redis.delete(redis_key)
+        except STORE_ERRORS as e:
+            # The claim expires after IDEMPOTENCY_LOCK_TTL
+            logger.warning("Idempotency key release failed: %s", e)
+
+    def _check(self, stored: Dict, fingerprint: str):
+        if stored.get("fingerprint") != fingerprint:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used with a different request"
+            )
+
+    async def run(
+        self,
+        scope: str,
+        key: str,
+        fingerprint: str,
+        func: Callable[[], Awaitable[Dict]]
+    ) -> Dict:
+        redis_key = self._redis_key(scope, key)
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+        delay = 0.05
+        while True:
+            local = self._in_flight.get(redis_key)
+            if local is not None:
+                stored = await asyncio.shield(local)
+                if stored is not None:
+                    self._check(stored, fingerprint)
+                    return stored["response"]
+                # The first attempt failed; try to claim the key ourselves
+                continue
+
+            try:
+                claimed = await redis.acquire_lock(
+                    redis_key,
+                    expire=settings.IDEMPOTENCY_LOCK_TTL,
+                    value={"state": IN_FLIGHT, "fingerprint": fingerprint}
+                )
+                stored = None if claimed else await redis.get(redis_key)
+            except STORE_ERRORS as e:
+                raise self._unavailable(e) from e
+
+            if claimed:
+                return await self._execute(redis_key, fingerprint, func)
+
+            if isinstance(stored, dict):
+                self._check(stored, fingerprint)
+                if stored.get("state") == DONE:
+                    logger.info("Replaying stored response for idempotency key")
+                    return stored["response"]
+
+            if time.monotonic() >= deadline:
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still in progress"
+                )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+    async def _execute(self, redis_key: str, fingerprint: str, func: Callable[[], Awaitable[Dict]]) -> Dict:
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[redis_key] = future
+        try:
+            response = await func()
+        except BaseException:
+            # Release the key so the client can retry a failed request
+            self._in_flight.pop(redis_key, None)
+            future.set_result(None)
+            await self._release(redis_key)
+            raise
+
+        stored = {"state": DONE, "fingerprint": fingerprint, "response": response}
+        try:
+            await redis.set(redis_key, stored, expire=settings.IDEMPOTENCY_TTL)
+        except STORE_ERRORS as e:
+            # Don't leave other replicas waiting on an IN_FLIGHT claim until it expires
+            logger.error("Storing idempotent response failed: %s", e)
+            await self._release(redis_key)
+        finally:
+            self._in_flight.pop(redis_key, None)
+            future.set_result(stored)
+        return response
+
+
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,223 @@
+import asyncio
+import gzip
+import os
+import re
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from sqlalchemy import delete, text
+from core.config import settings
+from db.session import engine, async_session
+from models.transaction_archive import TransactionArchive, TransactionArchiveStats
+from models.transaction_token import TransactionToken
+from utils.logger import logger
+from utils.redis import redis
+from utils.serialization import dumps
+
+PARENT = "transaction"
+PARTITION_NAME = re.compile(r"^transaction_y(\d{4})m(\d{2})$")
+MAINTENANCE_LOCK = "partitions:maintenance:lock"
+ARCHIVE_CHUNK_ROWS = 5000
+
+
+def _month_start(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def _sync_file(file):
+    file.flush()
+    os.fsync(file.fileno())
+
+
+def _sync_dir(path: str):
+    """Make a rename inside `path` durable"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{PARENT}_y{month.year:04d}m{month.month:02d}"
+
+
+class PartitionManager:
+    """
+    Maintains the monthly partitions of the transaction table.
+
+    Every PARTITION_MAINTENANCE_INTERVAL seconds one replica creates the
+    partitions for the next PARTITION_MONTHS_AHEAD months, then archives
+    partitions older than PARTITION_RETENTION_MONTHS that hold no pending
+    rows: rows are streamed to a gzipped NDJSON file and fsynced, per-website
+    totals are kept in transactionarchivestats for statistics, and the
+    partition is detached (and, with PARTITION_ARCHIVE_DROP, dropped) in the
+    same transaction that records the archive.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def ensure_partitions(self, now: Optional[datetime] = None):
+        month = _month_start(now or datetime.now(timezone.utc))
+        async with engine.begin() as conn:
+            for offset in range(settings.PARTITION_MONTHS_AHEAD + 1):
+                start = _add_months(month, offset)
+                end = _add_months(start, 1)
+                await conn.execute(text(
+                    f'CREATE TABLE IF NOT EXISTS "{partition_name(start)}" PARTITION OF "{PARENT}" '
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                ))
+
+    async def list_partitions(self) -> List[Tuple[str, datetime]]:
+        """(name, month start) of every monthly partition, oldest first"""
+        async with engine.connect() as conn:
+            result = await conn.execute(text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = :parent"
+            ), {"parent": PARENT})
+            names = result.scalars().all()
+
+        partitions = []
+        for name in names:
+            match = PARTITION_NAME.match(name)
+            if match:
+                month = datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+                partitions.append((name, month))
+        return sorted(partitions, key=lambda partition: partition[1])
+
+    async def _export(self, name: str, path: str) -> int:
+        """
+        Stream the partition's rows into a gzipped NDJSON file; returns the
+        row count. The file and its directory entry are fsynced before this
+        returns, since the partition may be dropped right after.
+        """
+        rows = 0
+        tmp_path = f"{path}.tmp"
+        raw = await asyncio.to_thread(open, tmp_path, "wb")
+        try:
+            archive = gzip.GzipFile(fileobj=raw, mode="wb")
+            try:
+                async with engine.connect() as conn:
+                    result = await conn.stream(
+                        text(f'SELECT * FROM "{name}" ORDER BY id'),
+                        execution_options={"yield_per": ARCHIVE_CHUNK_ROWS}
+                    )
+                    async for chunk in result.mappings().partitions():
+                        data = b"".join(dumps(dict(row)) + b"\n" for row in chunk)
+                        await asyncio.to_thread(archive.write, data)
+                        rows += len(chunk)
+            finally:
+                await asyncio.to_thread(archive.close)
+            await asyncio.to_thread(_sync_file, raw)
+        finally:
+            await asyncio.to_thread(raw.close)
+        os.replace(tmp_path, path)
+        await asyncio.to_thread(_sync_dir, os.path.dirname(os.path.abspath(path)))
+        return rows
+
+    async def archive_partition(self, name: str, month: datetime) -> bool:
+        async with engine.connect() as conn:
+            pending = await conn.scalar(text(
+                f"SELECT EXISTS (SELECT 1 FROM \"{name}\" WHERE status = 'pending')"
+            ))
+        if pending:
+            logger.info("Partition %s still has pending transactions, not archiving", name)
+            return False
+
+        os.makedirs(settings.PARTITION_ARCHIVE_DIR, exist_ok=True)
+        path = os.path.join(settings.PARTITION_ARCHIVE_DIR, f"{name}.ndjson.gz")
+        exported = await self._export(name, path)
+
+        async with async_session() as db:
+            # Give up rather than queue every query behind the detach lock
+            await db.execute(text(f"SET LOCAL lock_timeout = '{settings.PARTITION_LOCK_TIMEOUT_MS}ms'"))
+            summary = (await db.execute(text(
+                f'SELECT website_id, status, count(*), coalesce(sum(amount), 0) FROM "{name}" '
+                "GROUP BY website_id, status"
+            ))).all()
+            if sum(row[2] for row in summary) != exported:
+                raise RuntimeError(f"Partition {name} changed while it was being archived")
+
+            archive = TransactionArchive(
+                partition=name,
+                range_start=month,
+                range_end=_add_months(month, 1),
+                path=path,
+                row_count=exported
+            )
+            db.add(archive)
+            await db.flush()
+            db.add_all([
+                TransactionArchiveStats(
+                    archive_id=archive.id,
+                    website_id=website_id,
+                    status=status,
+                    count=count,
+                    amount=amount
+                )
+                for website_id, status, count, amount in summary
+            ])
+            # Archived tokens are no longer looked up; free their unique entries
+            await db.execute(delete(TransactionToken).where(
+                TransactionToken.created_at >= month,
+                TransactionToken.created_at < _add_months(month, 1)
+            ))
+            await db.execute(text(f'ALTER TABLE "{PARENT}" DETACH PARTITION "{name}"'))
+            if settings.PARTITION_ARCHIVE_DROP:
+                await db.execute(text(f'DROP TABLE "{name}"'))
+            await db.commit()
+
+        logger.info("Archived partition %s (%s rows) to %s", name, exported, path)
+        return True
+
+    async def archive_expired(self, now: Optional[datetime] = None):
+        cutoff = _add_months(_month_start(now or datetime.now(timezone.utc)), -settings.PARTITION_RETENTION_MONTHS)
+        for name, month in await self.list_partitions():
+            if _add_months(month, 1) > cutoff:
+                break
+            try:
+                await self.archive_partition(name, month)
+            except Exception as e:
+                logger.error("Archiving partition %s failed: %s", name, e)
+
+    async def run_once(self):
+        await self.ensure_partitions()
+        if settings.PARTITION_ARCHIVE_ENABLED:
+            await self.archive_expired()
+
+    async def _loop(self):
+        while True:
+            try:
+                # Only one replica maintains partitions per interval
+                if await redis.acquire_lock(MAINTENANCE_LOCK, expire=settings.PARTITION_MAINTENANCE_INTERVAL):
+                    await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Partition maintenance failed: %s", e)
+            await asyncio.sleep(settings.PARTITION_MAINTENANCE_INTERVAL)
+
+    def start(self):
+        if not settings.PARTITION_MAINTENANCE_ENABLED:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+partition_manager = PartitionManager()
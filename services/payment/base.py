@@ -1,8 +1,29 @@
 from abc import ABC, abstractmethod
 from typing import Optional, Dict
 from decimal import Decimal
+import aiohttp
+from utils.http import create_client_session
 
 class BasePaymentProvider(ABC):
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        """Open the provider's pooled HTTP session"""
+        if self._session is None or self._session.closed:
+            self._session = create_client_session()
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Return the shared session, opening it lazily if needed"""
+        await self.start()
+        return self._session
+
+    async def close(self):
+        """Close the provider's HTTP session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
     @abstractmethod
     async def create_payment(self, amount: Decimal, callback_url: str) -> Dict:
         """Create payment and return payment URL"""
@@ -11,4 +32,4 @@ class BasePaymentProvider(ABC):
     @abstractmethod
     async def verify_payment(self, token: str) -> Dict:
         """Verify payment and return transaction details"""
-        pass 
\ No newline at end of file
+        pass
@@ -1,16 +1,94 @@
 from core.config import settings
+from typing import Dict, List, Optional
 from .base import BasePaymentProvider
 from .zarinpal import ZarinpalProvider
 from .zibal import ZibalProvider
+from .resilience import ResilientPaymentProvider
 
-def get_payment_provider() -> BasePaymentProvider:
-    providers = {
-        "zarinpal": ZarinpalProvider,
-        'zibal': ZibalProvider
-    }
-    
-    provider_class = providers.get(settings.PAYMENT_GATEWAY)
-    if not provider_class:
-        raise ValueError(f"Payment gateway {settings.PAYMENT_GATEWAY} not supported")
-    
-    return provider_class() 
\ No newline at end of file
+PROVIDERS = {
+    "zarinpal": ZarinpalProvider,
+    'zibal': ZibalProvider
+}
+
+
+class ProviderRegistry:
+    """
+    Long-lived provider instances, one per merchant account, built once and
+    owned by the app lifespan. Each account has its own HTTP session and
+    circuit breaker, so one failing gateway or account doesn't affect others.
+    """
+
+    def __init__(self):
+        self._providers: Dict[str, BasePaymentProvider] = {}
+
+    @staticmethod
+    def accounts() -> Dict[str, Dict[str, str]]:
+        accounts = {
+            "zarinpal": {"gateway": "zarinpal", "merchant_id": settings.ZARINPAL_MERCHANT_ID},
+            "zibal": {"gateway": "zibal", "merchant_id": settings.ZIBAL_MERCHANT_ID},
+        }
+        accounts.update(settings.PAYMENT_ACCOUNTS)
+        return accounts
+
+    def build(self):
+        providers = {}
+        for name, account in self.accounts().items():
+            provider_class = PROVIDERS.get(account.get("gateway"))
+            if not provider_class:
+                raise ValueError(f"Payment gateway {account.get('gateway')} of account {name} not supported")
+            # Every provider gets deadlines, retries and a circuit breaker
+            providers[name] = ResilientPaymentProvider(
+                provider_class(merchant_id=account.get("merchant_id")),
+                name=name
+            )
+        if settings.PAYMENT_GATEWAY not in providers:
+            raise ValueError(f"Default payment account {settings.PAYMENT_GATEWAY} not configured")
+        self._providers = providers
+
+    def names(self) -> List[str]:
+        return list(self.accounts())
+
+    def get(self, name: Optional[str] = None) -> BasePaymentProvider:
+        """Provider of account `name`, or of the default account"""
+        if not self._providers:
+            self.build()
+        name = name or settings.PAYMENT_GATEWAY
+        provider = self._providers.get(name)
+        if provider is None:
+            raise ValueError(f"Payment account {name} not configured")
+        return provider
+
+    async def start(self):
+        if not self._providers:
+            self.build()
+        for provider in self._providers.values():
+            await provider.start()
+
+    async def close(self):
+        for provider in self._providers.values():
+            await provider.close()
+        self._providers = {}
+
+    def health(self) -> Dict[str, Dict]:
+        return {
+            name: provider.breaker.snapshot()
+            for name, provider in self._providers.items()
+        }
+
+
+provider_registry = ProviderRegistry()
+
+def get_payment_provider(name: Optional[str] = None) -> BasePaymentProvider:
+    return provider_registry.get(name)
+
+async def start_payment_providers():
+    """Build the registry and open pooled HTTP sessions for every account"""
+    await provider_registry.start()
+
+def get_provider_health() -> Dict[str, Dict]:
+    """Circuit breaker state of every account"""
+    return provider_registry.health()
+
+async def close_payment_providers():
+    """Close every provider session"""
+    await provider_registry.close()
@@ -2,55 +2,89 @@ from fastapi import HTTPException
 from repositories.website import WebsiteRepository
 from repositories.transaction import TransactionRepository
 from decimal import Decimal
-from typing import Dict
+from typing import AsyncIterator, Dict, Optional, Tuple, List
+from datetime import datetime
+import base64
+import asyncio
 from urllib.parse import urlparse
 from utils.logger import logger
 from core.config import settings
-import traceback
 from services.payment.factory import get_payment_provider
+from services.payment.resilience import CircuitOpenError
+from services.api_key_cache import api_key_cache
+from services.transaction_cache import transaction_cache
+from services.idempotency import idempotency_store
+from services.export import export_transactions
+from services.single_flight import verify_flight
+from utils.timing import timed_phase
+
+# Verification outcomes that never change, served without calling the gateway
+FINAL_STATUSES = ("completed", "failed", "expired")
 
 class ProxyPaymentService:
     def __init__(self, db_session):
         self.db = db_session
         self.website_repo = WebsiteRepository(db_session)
         self.transaction_repo = TransactionRepository(db_session)
-        self.payment_provider = get_payment_provider()
     
     async def validate_api_key(self, api_key: str):
-        website = await self.website_repo.get_by_api_key(api_key)
+        with timed_phase("api_key"):
+            website = await api_key_cache.get_website(api_key, self.website_repo)
         if not website:
-            logger.warning(f"Invalid API key attempt: {api_key}")
+            logger.warning("Invalid API key attempt: %s...", api_key[:6])
             raise HTTPException(status_code=403, detail="Invalid API key")
         return website
 
     def validate_callback_url(self, website, callback_url: str) -> bool:
         try:
             callback_domain = urlparse(callback_url).netloc
-            logger.info(f"Callback: {callback_domain}, {website.domain}")
+            logger.debug("Callback: %s, %s", callback_domain, website.domain)
             return callback_domain == website.domain
         except Exception as e:
-            logger.error(f"Callback URL validation error: {str(e)}")
+            logger.error("Callback URL validation error: %s", e)
             return False
 
-    async def create_payment(self, api_key: str, amount: Decimal, user_phone: str, callback_url: str) -> Dict:
+    async def create_payment(
+        self,
+        api_key: str,
+        amount: Decimal,
+        user_phone: str,
+        callback_url: str,
+        idempotency_key: Optional[str] = None
+    ) -> Dict:
+        """Create payment, replaying the stored response for a repeated idempotency key"""
+        if not idempotency_key:
+            return await self._create_payment(api_key, amount, user_phone, callback_url)
+
+        website = await self.validate_api_key(api_key)
+        return await idempotency_store.run(
+            scope=f"create:{website.id}",
+            key=idempotency_key,
+            fingerprint=idempotency_store.fingerprint(amount, user_phone, callback_url),
+            func=lambda: self._create_payment(api_key, amount, user_phone, callback_url)
+        )
+
+    async def _create_payment(self, api_key: str, amount: Decimal, user_phone: str, callback_url: str) -> Dict:
         """Create payment and get gateway token"""
         try:
             website = await self.validate_api_key(api_key)
             
             if not self.validate_callback_url(website, callback_url):
-                logger.warning(f"Invalid callback URL attempt: {callback_url} for website: {website.id}")
+                logger.warning("Invalid callback URL attempt: %s for website: %s", callback_url, website.id)
                 raise HTTPException(status_code=400, detail="Invalid callback URL")
 
-            # Create payment in gateway first
-            payment_result = await self.payment_provider.create_payment(
-                amount=amount,
-                callback_url=f"{settings.BASE_URL}/gateway/callback",
-                user_phone=user_phone
-            )
-            logger.info(f"payment: {payment_result}")
+            # Create payment in gateway first, through the website's own account
+            account = website.gateway or settings.PAYMENT_GATEWAY
+            with timed_phase("gateway"):
+                payment_result = await get_payment_provider(account).create_payment(
+                    amount=amount,
+                    callback_url=f"{settings.BASE_URL}/gateway/callback",
+                    user_phone=user_phone
+                )
+            logger.debug("payment: %s", payment_result)
 
             if not payment_result["status"]:
-                logger.error(f"Gateway payment creation failed: {payment_result}")
+                logger.error("Gateway payment creation failed: %s", payment_result)
                 raise HTTPException(status_code=500, detail="Gateway payment failed")
 
             # Generate unique token and save transaction
@@ -60,10 +94,11 @@ class ProxyPaymentService:
                 user_phone=user_phone,
                 callback_url=callback_url,
                 gateway_token=payment_result["token"],
-                gateway_url=payment_result["url"]
+                gateway_url=payment_result["url"],
+                provider=account
             )
 
-            logger.info(f"Created payment request: {payment_result['token']} for website: {website.id}")
+            logger.info("Created payment request: %s for website: %s", payment_result['token'], website.id)
             
             return {
                 "status": True,
@@ -74,16 +109,20 @@ class ProxyPaymentService:
         except HTTPException as http_ex:
             raise http_ex
 
+        except CircuitOpenError as e:
+            logger.warning("Payment creation rejected: %s", e)
+            raise HTTPException(status_code=503, detail="Payment gateway unavailable")
+
         except Exception as e:
-            logger.error(f"Payment creation error: {str(e)}")
+            logger.error("Payment creation error: %s", e)
             raise HTTPException(status_code=500, detail="Payment creation failed")
 
     async def process_payment(self, gateway_token: str) -> Dict:
         """Get payment URL for redirect"""
         try:
-            transaction = await self.transaction_repo.get_by_gateway_token(gateway_token)
+            transaction = await transaction_cache.fetch(gateway_token, self.transaction_repo)
             if not transaction:
-                logger.warning(f"Invalid payment token attempt: {gateway_token}")
+                logger.warning("Invalid payment token attempt: %s", gateway_token)
                 raise HTTPException(status_code=404, detail="Transaction not found")
 
             # Just return the gateway URL with authority
@@ -91,42 +130,224 @@ class ProxyPaymentService:
                 "redirect_url": transaction.gateway_url
             }
 
+        except HTTPException as http_ex:
+            raise http_ex
+
         except Exception as e:
-            logger.error(f"Payment processing error: {str(e)}")
+            logger.error("Payment processing error: %s", e)
             raise HTTPException(status_code=500, detail="Payment processing failed")
 
+    @staticmethod
+    def _final_result(transaction) -> Dict:
+        """Stored outcome of a transaction that was already verified"""
+        if transaction.status == "completed":
+            return {"status": True, "ref_id": transaction.ref_id, "already_verified": True}
+        if transaction.status == "expired":
+            return {"status": False, "message": "Payment expired", "already_verified": True}
+        return {"status": False, "message": "Payment verification failed", "already_verified": True}
+
     async def verify_payment(self, authority: str, website_token: str) -> Dict:
-        """Verify payment with gateway"""
+        """
+        Verify payment with gateway. Settled transactions are answered from
+        the cache or database; otherwise concurrent calls for the same
+        authority share one gateway verification.
+        """
         try:
             website = await self.validate_api_key(website_token)
-            transaction = await self.transaction_repo.get_by_gateway_token(authority)
-            
-            if not transaction:
-                logger.warning(f"Invalid authority in verify: {authority}")
-                raise HTTPException(status_code=404, detail="Transaction not found")
 
-            if transaction.website_id != website.id:
-                logger.warning(f"Website mismatch in verify. Expected: {transaction.website_id}, Got: {website.id}")
-                raise HTTPException(status_code=403, detail="Invalid website token")
+            record = await transaction_cache.get(authority)
+            if record is not None and record.status in FINAL_STATUSES:
+                if record.website_id != website.id:
+                    logger.warning("Website mismatch in verify. Expected: %s, Got: %s", record.website_id, website.id)
+                    raise HTTPException(status_code=403, detail="Invalid website token")
+                return self._final_result(record)
 
-            verify_result = await self.payment_provider.verify_payment(authority, transaction.amount)
+            return await verify_flight.run(
+                f"verify:{website.id}:{authority}",
+                lambda: self._verify_payment(authority, website)
+            )
 
-            if verify_result["status"]:
-                await self.transaction_repo.update_status(
-                    token=authority,
-                    status="completed",
-                    ref_id=str(verify_result["ref_id"])
-                )
-                logger.info(f"Payment verified successfully: {authority}")
-            else:
-                await self.transaction_repo.update_status(
-                    token=authority,
-                    status="failed"
-                )
-                logger.warning(f"Payment verification failed: {authority}")
+        except HTTPException as http_ex:
+            raise http_ex
 
-            return verify_result
+        except CircuitOpenError as e:
+            logger.warning("Payment verification rejected: %s", e)
+            raise HTTPException(status_code=503, detail="Payment gateway unavailable")
 
         except Exception as e:
-            logger.error(f"Payment verification error: {traceback.format_exc()}")
-            raise HTTPException(status_code=500, detail="Payment verification failed") 
\ No newline at end of file
+            logger.exception("Payment verification error")
+            raise HTTPException(status_code=500, detail="Payment verification failed")
+
+    async def _verify_payment(self, authority: str, website) -> Dict:
+        # Read from the primary: another replica may have just settled it
+        transaction = await self.transaction_repo.get_by_gateway_token(authority, use_replica=False)
+
+        if not transaction:
+            logger.warning("Invalid authority in verify: %s", authority)
+            raise HTTPException(status_code=404, detail="Transaction not found")
+
+        if transaction.website_id != website.id:
+            logger.warning("Website mismatch in verify. Expected: %s, Got: %s", transaction.website_id, website.id)
+            raise HTTPException(status_code=403, detail="Invalid website token")
+
+        if transaction.status in FINAL_STATUSES:
+            return self._final_result(transaction)
+
+        # Verify with the account that created the payment
+        provider = get_payment_provider(transaction.provider)
+        with timed_phase("gateway"):
+            verify_result = await provider.verify_payment(authority, transaction.amount)
+
+        if verify_result["status"]:
+            ref_id = verify_result.get("ref_id")
+            row = await self.transaction_repo.update_status(
+                token=authority,
+                status="completed",
+                ref_id=str(ref_id) if ref_id is not None else None
+            )
+            logger.info("Payment verified successfully: %s", authority)
+        else:
+            row = await self.transaction_repo.update_status(
+                token=authority,
+                status="failed"
+            )
+            logger.warning("Payment verification failed: %s", authority)
+
+        if row is None:
+            # Settled elsewhere while the gateway call was running; its outcome stands
+            await self.db.refresh(transaction)
+            return self._final_result(transaction)
+
+        return verify_result
+
+    async def verify_payments(self, authorities: List[str], website_token: str) -> List[Dict]:
+        """
+        Verify many payments: one lookup answers unknown and settled
+        authorities, the rest are verified at the gateway with bounded
+        concurrency, each coalesced with concurrent verifies of the same
+        authority, and all outcomes are written with one guarded UPDATE.
+        """
+        website = await self.validate_api_key(website_token)
+        authorities = list(dict.fromkeys(authorities))
+
+        transactions = {
+            transaction.gateway_token: transaction
+            for transaction in await self.transaction_repo.get_by_gateway_tokens(authorities)
+        }
+        semaphore = asyncio.Semaphore(settings.BATCH_VERIFY_CONCURRENCY)
+        changes = []
+
+        async def verify_one(authority: str) -> Dict:
+            transaction = transactions.get(authority)
+            if not transaction or transaction.website_id != website.id:
+                return {"authority": authority, "status": False, "message": "Transaction not found"}
+
+            if transaction.status in FINAL_STATUSES:
+                return {"authority": authority, "ref_id": None, "message": None, **self._final_result(transaction)}
+
+            try:
+                async with semaphore:
+                    provider = get_payment_provider(transaction.provider)
+                    verify_result = await verify_flight.run(
+                        f"verify:{website.id}:{authority}",
+                        lambda: provider.verify_payment(authority, transaction.amount)
+                    )
+            except Exception as e:
+                # Gateway errors leave the transaction untouched so it can be retried
+                logger.error("Batch verification error for %s: %s", authority, e)
+                return {"authority": authority, "status": False, "message": "Payment verification failed"}
+
+            ref_id = verify_result.get("ref_id")
+            ref_id = str(ref_id) if ref_id is not None else None
+            if not verify_result.get("already_verified"):
+                changes.append((authority, "completed" if verify_result["status"] else "failed", ref_id))
+
+            return {
+                "authority": authority,
+                "status": bool(verify_result["status"]),
+                "ref_id": ref_id,
+                "message": verify_result.get("message")
+            }
+
+        with timed_phase("gateway"):
+            results = await asyncio.gather(*(verify_one(authority) for authority in authorities))
+
+        try:
+            settled = await self.transaction_repo.apply_status_changes(changes)
+        except Exception:
+            logger.exception("Batch verification update error")
+            raise HTTPException(status_code=500, detail="Payment verification failed")
+
+        # Authorities settled elsewhere while their gateway call ran keep that outcome
+        raced = {token for token, _, _ in changes} - settled.keys()
+        for result in results:
+            if result["authority"] in raced:
+                transaction = transactions[result["authority"]]
+                await self.db.refresh(transaction)
+                result.update({"ref_id": None, "message": None, **self._final_result(transaction)})
+
+        logger.info("Batch verified %s of %s payments for website: %s", len(settled), len(authorities), website.id)
+        return results
+
+    @staticmethod
+    def _encode_cursor(created_at: datetime, transaction_id: int) -> str:
+        raw = f"{created_at.isoformat()}|{transaction_id}".encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+        try:
+            created_at, transaction_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+            return datetime.fromisoformat(created_at), int(transaction_id)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    async def list_transactions(
+        self,
+        api_key: str,
+        status: Optional[str] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Dict:
+        """List the website's transactions, newest first, using keyset pagination"""
+        website = await self.validate_api_key(api_key)
+        after = self._decode_cursor(cursor) if cursor else None
+
+        # Fetch one extra row to know whether another page exists
+        rows = await self.transaction_repo.list_website_transactions(
+            website_id=website.id,
+            status=status,
+            limit=limit + 1,
+            after=after
+        )
+        items = [dict(row) for row in rows[:limit]]
+
+        next_cursor = None
+        if len(rows) > limit:
+            last = items[-1]
+            next_cursor = self._encode_cursor(last["created_at"], last["id"])
+
+        return {
+            "items": items,
+            "next_cursor": next_cursor
+        }
+
+    async def export_transactions(
+        self,
+        api_key: str,
+        fmt: str,
+        status: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None
+    ) -> AsyncIterator[bytes]:
+        """Validate the key up front, then return the gzip-compressed export stream"""
+        website = await self.validate_api_key(api_key)
+        if created_from and created_to and created_from >= created_to:
+            raise HTTPException(status_code=400, detail="created_from must be before created_to")
+        return export_transactions(
+            website_id=website.id,
+            fmt=fmt,
+            status=status,
+            created_from=created_from,
+            created_to=created_to
+        )
@@ -0,0 +1,171 @@
+import asyncio
+import random
+import time
+from decimal import Decimal
+from typing import Awaitable, Callable, Dict
+import aiohttp
+from core.config import settings
+from utils.logger import logger
+from utils.metrics import GATEWAY_LATENCY, GATEWAY_RESULTS
+from .base import BasePaymentProvider
+
+# Failures that are safe to retry and count against the breaker
+TRANSIENT_ERRORS = (asyncio.TimeoutError, aiohttp.ClientError)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the provider's breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker. After `failure_threshold` consecutive
+    failures it opens and rejects calls for `recovery_timeout` seconds, then
+    lets a single probe call through (half-open) to decide whether to close.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            return self.HALF_OPEN
+        return self._state
+
+    def before_call(self) -> bool:
+        """Admit a call or raise CircuitOpenError; returns True when the call is the half-open probe"""
+        state = self.state
+        if state == self.OPEN:
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        if state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                raise CircuitOpenError(f"{self.name} circuit is half-open")
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def release_probe(self):
+        """Give up a probe that ended without an answer (e.g. cancelled), so another call can probe"""
+        self._probe_in_flight = False
+
+    def record_success(self):
+        if self._state != self.CLOSED:
+            logger.info("%s circuit closed", self.name)
+        self._state = self.CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self._failures += 1
+        self._probe_in_flight = False
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                logger.warning("%s circuit opened after %s failures", self.name, self._failures)
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures
+        }
+
+
+class ResilientPaymentProvider(BasePaymentProvider):
+    """
+    Wraps a provider with per-operation deadlines, jittered retries for
+    verify and a circuit breaker. Retrying verify is safe because providers
+    report "already verified" answers (Zarinpal 101, Zibal 201) as success.
+    create_payment is never retried since it would open a second payment.
+    """
+
+    def __init__(self, provider: BasePaymentProvider, name: str):
+        super().__init__()
+        self.provider = provider
+        self.name = name
+        self.breaker = CircuitBreaker(
+            name=name,
+            failure_threshold=settings.GATEWAY_BREAKER_FAILURE_THRESHOLD,
+            recovery_timeout=settings.GATEWAY_BREAKER_RECOVERY_TIMEOUT
+        )
+
+    async def start(self):
+        await self.provider.start()
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        return await self.provider.get_session()
+
+    async def close(self):
+        await self.provider.close()
+
+    async def _call(self, operation: str, func: Callable[[], Awaitable[Dict]], timeout: float, retries: int) -> Dict:
+        attempt = 0
+        latency = GATEWAY_LATENCY.labels(self.name, operation)
+        while True:
+            try:
+                probe = self.breaker.before_call()
+            except CircuitOpenError:
+                GATEWAY_RESULTS.labels(self.name, operation, "circuit_open").inc()
+                raise
+
+            start = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(func(), timeout=timeout)
+            except TRANSIENT_ERRORS as e:
+                latency.observe(time.perf_counter() - start)
+                GATEWAY_RESULTS.labels(self.name, operation, type(e).__name__).inc()
+                self.breaker.record_failure()
+                if attempt >= retries:
+                    raise
+                # Full jitter exponential backoff
+                delay = random.uniform(0, min(
+                    settings.GATEWAY_RETRY_MAX_DELAY,
+                    settings.GATEWAY_RETRY_BASE_DELAY * (2 ** attempt)
+                ))
+                attempt += 1
+                logger.warning("%s call failed (%s), retry %s in %.2fs", self.name, type(e).__name__, attempt, delay)
+                await asyncio.sleep(delay)
+                continue
+            except Exception as e:
+                latency.observe(time.perf_counter() - start)
+                GATEWAY_RESULTS.labels(self.name, operation, type(e).__name__).inc()
+                self.breaker.record_failure()
+                raise
+            except BaseException:
+                # Cancelled: neither a success nor a failure, but the probe slot must be freed
+                if probe:
+                    self.breaker.release_probe()
+                raise
+
+            latency.observe(time.perf_counter() - start)
+            GATEWAY_RESULTS.labels(self.name, operation, str(result.get("code", result.get("status")))).inc()
+            self.breaker.record_success()
+            return result
+
+    async def create_payment(self, amount: Decimal, callback_url: str, **kwargs) -> Dict:
+        return await self._call(
+            "create",
+            lambda: self.provider.create_payment(amount=amount, callback_url=callback_url, **kwargs),
+            timeout=settings.GATEWAY_CREATE_TIMEOUT,
+            retries=0
+        )
+
+    async def verify_payment(self, token: str, *args, **kwargs) -> Dict:
+        return await self._call(
+            "verify",
+            lambda: self.provider.verify_payment(token, *args, **kwargs),
+            timeout=settings.GATEWAY_VERIFY_TIMEOUT,
+            retries=settings.GATEWAY_VERIFY_RETRIES
+        )
@@ -1,9 +1,9 @@
 from .base import BasePaymentProvider
 from core.config import settings
-import aiohttp
 from decimal import Decimal
-from typing import Dict
+from typing import Dict, Optional
 from utils.logger import logger
+from utils.serialization import loads
 
 class ZarinpalProvider(BasePaymentProvider):
     URLS = {
@@ -19,17 +19,24 @@ class ZarinpalProvider(BasePaymentProvider):
         }
     }
 
-    def __init__(self):
+    def __init__(self, merchant_id: Optional[str] = None):
+        super().__init__()
         self.is_sandbox = settings.PAYMENT_ENV == 'sandbox'
         self.merchant_id = (
             '1344b5d4-0048-11e8-94db-005056a205be' 
             if self.is_sandbox 
-            else settings.ZARINPAL_MERCHANT_ID
+            else merchant_id or settings.ZARINPAL_MERCHANT_ID
         )
         env = 'sandbox' if self.is_sandbox else 'production'
         self.api_url = self.URLS[env]['request']
         self.payment_url = self.URLS[env]['payment']
         self.verify_url = self.URLS[env]['verify']
+
+        if settings.ZARINPAL_API_BASE:
+            base = settings.ZARINPAL_API_BASE.rstrip('/')
+            self.api_url = f"{base}/pg/v4/payment/request.json"
+            self.payment_url = f"{base}/pg/StartPay/"
+            self.verify_url = f"{base}/pg/v4/payment/verify.json"
         
     async def create_payment(self, amount: Decimal, callback_url: str, user_phone: str) -> Dict:
         data = {
@@ -42,35 +49,34 @@ class ZarinpalProvider(BasePaymentProvider):
             }
         }
         
-        logger.info(f"Payment request to Zarinpal (sandbox: {self.is_sandbox})", extra={
+        logger.debug("Payment request to Zarinpal (sandbox: %s)", self.is_sandbox, extra={
             "api_url": self.api_url,
             "data": data
         })
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                self.api_url,
-                json=data,
-                headers={
-                    "Content-Type": "application/json",
-                    "Accept": "application/json"
-                }
-            ) as response:
-                result = await response.json()
-                logger.info(f"Zarinpal response", extra={"response": result})
-                
-                if result.get("data", {}).get("code") == 100:
-                    authority = result["data"]["authority"]
-                    return {
-                        "status": True,
-                        "token": authority,
-                        "url": f"{self.payment_url}{authority}"
-                    }
+        session = await self.get_session()
+        async with session.post(
+            self.api_url,
+            json=data
+        ) as response:
+            result = await response.json(loads=loads)
+            logger.debug("Zarinpal response", extra={"response": result})
+            code = self._result_code(result)
                 
+            if code == 100:
+                authority = result["data"]["authority"]
                 return {
-                    "status": False,
-                    "message": result.get("errors", {}).get("message", "خطا در اتصال به درگاه پرداخت")
+                    "code": code,
+                    "status": True,
+                    "token": authority,
+                    "url": f"{self.payment_url}{authority}"
                 }
+                
+            return {
+                "code": code,
+                "status": False,
+                "message": result.get("errors", {}).get("message", "خطا در اتصال به درگاه پرداخت")
+            }
     
     async def verify_payment(self, token: str, amount) -> Dict:
         data = {
@@ -79,33 +85,37 @@ class ZarinpalProvider(BasePaymentProvider):
             "amount": int(amount) * 10
         }
         
-        logger.info(f"Payment verification request to Zarinpal: {str(data)}")
+        logger.debug("Payment verification request to Zarinpal: %s", data)
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                self.verify_url,
-                json=data,
-                headers={
-                    "Content-Type": "application/json",
-                    "Accept": "application/json"
-                }
-            ) as response:
-                result = await response.json()
-                logger.info(f"Zarinpal verification response: {str(result)}")
+        session = await self.get_session()
+        async with session.post(
+            self.verify_url,
+            json=data
+        ) as response:
+            result = await response.json(loads=loads)
+            logger.debug("Zarinpal verification response: %s", result)
+            code = self._result_code(result)
                 
-                if result.get("data", {}).get("code") == 100:
-                    return {
-                        "status": True,
-                        "ref_id": result["data"].get("ref_id")
-                    }
+            # 101 means this authority was already verified, e.g. by an
+            # earlier attempt whose response was lost; the payment succeeded
+            if code in (100, 101):
+                return {
+                    "code": code,
+                    "status": True,
+                    "ref_id": result["data"].get("ref_id")
+                }
 
-                if result.get("data", {}).get("code") == 101:
-                    return {
-                        "status": False,
-                        "ref_id": result["data"].get("ref_id")
-                    }
+            return {
+                "code": code,
+                "status": False,
+                "message": result.get("errors", {}).get("message", "خطا در تایید پرداخت")
+            }
 
-                return {
-                    "status": False,
-                    "message": result.get("errors", {}).get("message", "خطا در تایید پرداخت")
-                } 
\ No newline at end of file
+    @staticmethod
+    def _result_code(result: Dict):
+        """Zarinpal puts the code in `data` on success and in `errors` on failure"""
+        for section in ("data", "errors"):
+            value = result.get(section)
+            if isinstance(value, dict) and "code" in value:
+                return value["code"]
+        return None
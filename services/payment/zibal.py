@@ -1,9 +1,9 @@
 from .base import BasePaymentProvider
 from core.config import settings
-import aiohttp
 from decimal import Decimal
-from typing import Dict
+from typing import Dict, Optional
 from utils.logger import logger
+from utils.serialization import loads
 
 class ZibalProvider(BasePaymentProvider):
     URLS = {
@@ -12,11 +12,18 @@ class ZibalProvider(BasePaymentProvider):
         'verify': 'https://gateway.zibal.ir/v1/verify'
     }
 
-    def __init__(self):
-        self.merchant_id = settings.ZIBAL_MERCHANT_ID
+    def __init__(self, merchant_id: Optional[str] = None):
+        super().__init__()
+        self.merchant_id = merchant_id or settings.ZIBAL_MERCHANT_ID
         self.api_url = self.URLS['request']
         self.payment_url = self.URLS['payment']
         self.verify_url = self.URLS['verify']
+
+        if settings.ZIBAL_API_BASE:
+            base = settings.ZIBAL_API_BASE.rstrip('/')
+            self.api_url = f"{base}/v1/request"
+            self.payment_url = f"{base}/start/"
+            self.verify_url = f"{base}/v1/verify"
         
     async def create_payment(self, amount: Decimal, callback_url: str, user_phone: str) -> Dict:
         data = {
@@ -28,38 +35,36 @@ class ZibalProvider(BasePaymentProvider):
             "orderId": None  # می‌تونید یک شناسه سفارش اختصاص بدید
         }
         
-        logger.info("Payment request to Zibal", extra={
+        logger.debug("Payment request to Zibal", extra={
             "api_url": self.api_url,
             "data": data
         })
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                self.api_url,
-                json=data,
-                headers={
-                    "Content-Type": "application/json",
-                    "Accept": "application/json"
-                }
-            ) as response:
-                result = await response.json()
-                logger.info("Zibal response", extra={
-                    "response": response.status,
-                    "result": result
-                })
-                
-                if result.get("result") == 100:
-                    track_id = result["trackId"]
-                    return {
-                        "status": True,
-                        "token": str(track_id),  # تبدیل به string برای جلوگیری از خطا
-                        "url": f"{self.payment_url}{track_id}"
-                    }
+        session = await self.get_session()
+        async with session.post(
+            self.api_url,
+            json=data
+        ) as response:
+            result = await response.json(loads=loads)
+            logger.debug("Zibal response", extra={
+                "response": response.status,
+                "result": result
+            })
                 
+            if result.get("result") == 100:
+                track_id = result["trackId"]
                 return {
-                    "status": False,
-                    "message": self._get_error_message(result.get("result"))
+                    "code": result.get("result"),
+                    "status": True,
+                    "token": str(track_id),  # تبدیل به string برای جلوگیری از خطا
+                    "url": f"{self.payment_url}{track_id}"
                 }
+                
+            return {
+                "code": result.get("result"),
+                "status": False,
+                "message": self._get_error_message(result.get("result"))
+            }
     
     async def verify_payment(self, token: str, amount: Decimal) -> Dict:
         data = {
@@ -67,30 +72,31 @@ class ZibalProvider(BasePaymentProvider):
             "trackId": token
         }
         
-        logger.info(f"Payment verification request to Zibal token: {token} amount: {amount}")
+        logger.debug("Payment verification request to Zibal token: %s amount: %s", token, amount)
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                self.verify_url,
-                json=data,
-                headers={
-                    "Content-Type": "application/json",
-                    "Accept": "application/json"
-                }
-            ) as response:
-                result = await response.json()
-                logger.info(f"Zibal verification response: {str(result)}")
+        session = await self.get_session()
+        async with session.post(
+            self.verify_url,
+            json=data
+        ) as response:
+            result = await response.json(loads=loads)
+            logger.debug("Zibal verification response: %s", result)
 
-                if result.get("result") == 100:
-                    return {
-                        "status": True,
-                        "ref_id": str(result.get("refNumber"))  # تبدیل به string
-                    }
-                
+            # 201 means this trackId was already verified, e.g. by an
+            # earlier attempt whose response was lost; the payment succeeded
+            if result.get("result") in (100, 201):
+                ref_number = result.get("refNumber")
                 return {
-                    "status": False,
-                    "message": self._get_error_message(result.get("result"))
+                    "code": result.get("result"),
+                    "status": True,
+                    "ref_id": str(ref_number) if ref_number is not None else None  # تبدیل به string
                 }
+                
+            return {
+                "code": result.get("result"),
+                "status": False,
+                "message": self._get_error_message(result.get("result"))
+            }
 
     def _get_error_message(self, error_code: int) -> str:
         """
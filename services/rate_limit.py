@@ -0,0 +1,102 @@
+import math
+from typing import Tuple
+from fastapi import Depends, Header, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import settings
+from db.session import get_db
+from repositories.website import WebsiteRepository
+from services.api_key_cache import api_key_cache, WebsiteRecord
+from utils.logger import logger
+from utils.redis import redis
+
+# Token bucket refilled continuously at `rate` tokens/second up to `capacity`.
+# Uses the Redis clock so every replica sees the same time.
+TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) / 1000 * rate)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = math.ceil((cost - tokens) / rate * 1000)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, retry_after}
+"""
+
+
+class RateLimiter:
+    """Per-website, per-endpoint token bucket limiter backed by one Redis script"""
+
+    @staticmethod
+    def _key(website_id: int, endpoint: str) -> str:
+        return f"ratelimit:{website_id}:{endpoint}"
+
+    @staticmethod
+    def limit_for(website: WebsiteRecord, endpoint: str) -> int:
+        limits = website.rate_limits or {}
+        return int(limits.get(endpoint, settings.RATE_LIMITS.get(endpoint, 0)))
+
+    async def check(self, website_id: int, endpoint: str, per_minute: int, cost: int = 1) -> Tuple[bool, int]:
+        """Take `cost` tokens; returns (allowed, retry_after_ms)"""
+        rate = per_minute / 60
+        capacity = max(cost, rate * settings.RATE_LIMIT_BURST_SECONDS)
+        allowed, retry_after = await redis.run_script(
+            TOKEN_BUCKET,
+            keys=[self._key(website_id, endpoint)],
+            args=[rate, capacity, cost]
+        )
+        return bool(allowed), int(retry_after)
+
+    async def enforce(self, website: WebsiteRecord, endpoint: str):
+        per_minute = self.limit_for(website, endpoint)
+        if not settings.RATE_LIMIT_ENABLED or per_minute <= 0:
+            return
+
+        try:
+            allowed, retry_after = await self.check(website.id, endpoint, per_minute)
+        except Exception as e:
+            # Fail open: an unavailable limiter must not take payments down
+            logger.warning("Rate limiter unavailable: %s", e)
+            return
+
+        if not allowed:
+            logger.warning("Rate limit exceeded for website %s on %s", website.id, endpoint)
+            raise HTTPException(
+                status_code=429,
+                detail="Rate limit exceeded",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after / 1000)))}
+            )
+
+
+rate_limiter = RateLimiter()
+
+
+def rate_limit(endpoint: str):
+    """
+    Dependency that resolves the API key through the key cache and applies
+    the website's limit for `endpoint` before the handler does any work.
+    """
+    async def dependency(
+        x_api_key: str = Header(...),
+        db: AsyncSession = Depends(get_db)
+    ):
+        website = await api_key_cache.get_website(x_api_key, WebsiteRepository(db))
+        if not website:
+            raise HTTPException(status_code=403, detail="Invalid API key")
+        await rate_limiter.enforce(website, endpoint)
+
+    return dependency
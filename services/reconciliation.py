@@ -0,0 +1,119 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict
+from core.config import settings
+from db.session import async_session
+from repositories.transaction import TransactionRepository
+from services.payment.factory import get_payment_provider
+from utils.logger import logger
+
+
+class PendingReconciler:
+    """
+    Background worker that settles transactions left pending.
+
+    Every RECONCILE_INTERVAL seconds it walks pending transactions older than
+    RECONCILE_MIN_AGE in batches. Each batch is leased (reconcile_until) and
+    committed before the gateway is called, so no row lock or connection is
+    held during verification. Paid transactions are marked completed, and
+    ones older than PENDING_EXPIRY that the gateway reports unpaid are
+    expired, with one guarded UPDATE that only touches rows still pending.
+    The rest, including any whose verify failed, get their lease back.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def _verify(self, transaction, semaphore: asyncio.Semaphore) -> Optional[Dict]:
+        try:
+            async with semaphore:
+                provider = get_payment_provider(transaction.provider)
+                return await provider.verify_payment(transaction.gateway_token, transaction.amount)
+        except Exception as e:
+            logger.warning("Reconciliation verify failed for %s: %s", transaction.gateway_token, e)
+            return None
+
+    async def _run_batch(self, created_before: datetime, expire_before: datetime, after) -> Optional[tuple]:
+        semaphore = asyncio.Semaphore(settings.RECONCILE_CONCURRENCY)
+
+        async with async_session() as db:
+            transactions = await TransactionRepository(db).lease_pending(
+                created_before=created_before,
+                limit=settings.RECONCILE_BATCH_SIZE,
+                lease_seconds=settings.RECONCILE_LEASE_SECONDS,
+                after=after
+            )
+        if not transactions:
+            return None
+
+        results = await asyncio.gather(*(
+            self._verify(transaction, semaphore)
+            for transaction in transactions
+        ))
+
+        changes = []
+        for transaction, result in zip(transactions, results):
+            if result and result["status"]:
+                ref_id = result.get("ref_id")
+                changes.append((transaction.gateway_token, "completed", str(ref_id) if ref_id is not None else None))
+            elif result is not None and transaction.created_at < expire_before:
+                # Only a definite non-success answer expires a payment; after a
+                # gateway error it stays pending and is retried next run
+                changes.append((transaction.gateway_token, "expired", None))
+
+        async with async_session() as db:
+            repo = TransactionRepository(db)
+            settled = await repo.apply_status_changes(changes)
+            await repo.release_leases([
+                transaction.gateway_token
+                for transaction in transactions
+                if transaction.gateway_token not in settled
+            ])
+
+        completed = sum(1 for row in settled.values() if row.status == "completed")
+        logger.info(
+            "Reconciled %s pending transactions: %s completed, %s expired",
+            len(transactions), completed, len(settled) - completed
+        )
+
+        last = transactions[-1]
+        return last.created_at, last.id
+
+    async def run_once(self):
+        now = datetime.now(timezone.utc)
+        created_before = now - timedelta(seconds=settings.RECONCILE_MIN_AGE)
+        expire_before = now - timedelta(seconds=settings.PENDING_EXPIRY)
+
+        after = None
+        for _ in range(settings.RECONCILE_MAX_BATCHES):
+            after = await self._run_batch(created_before, expire_before, after)
+            if after is None:
+                break
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(settings.RECONCILE_INTERVAL)
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Pending reconciliation failed: %s", e)
+
+    def start(self):
+        if not settings.RECONCILE_ENABLED:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+pending_reconciler = PendingReconciler()
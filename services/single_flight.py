@@ -0,0 +1,97 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict
+from fastapi import HTTPException
+from core.config import settings
+from utils.logger import logger
+from utils.redis import redis
+
+_FAILED = object()
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time.
+
+    Concurrent callers in the same process await the call already in flight
+    and share its result. Across replicas the call runs under a short Redis
+    lock, renewed every third of its TTL while the call runs so it can't
+    expire under a slow call; callers that can't take it wait for it to be
+    released and then run the call themselves, so `func` should first check
+    whether the work has already been done. If the call fails, local waiters
+    retry on their own.
+    """
+
+    def __init__(self, lock_ttl: int, wait_timeout: float):
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            local = self._in_flight.get(key)
+            if local is None:
+                break
+            result = await asyncio.shield(local)
+            if result is not _FAILED:
+                return result
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await self._run_locked(key, func)
+        except BaseException:
+            self._in_flight.pop(key, None)
+            future.set_result(_FAILED)
+            raise
+        self._in_flight.pop(key, None)
+        future.set_result(result)
+        return result
+
+    async def _run_locked(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.wait_timeout
+        delay = 0.05
+
+        while True:
+            try:
+                acquired = await redis.acquire_lock(lock_key, expire=self.lock_ttl, value=token)
+            except Exception as e:
+                # Without Redis only the in-process coalescing applies
+                logger.warning("Single-flight lock unavailable for %s: %s", key, e)
+                return await func()
+
+            if acquired:
+                renewal = asyncio.create_task(self._keep_lock(key, lock_key, token))
+                try:
+                    return await func()
+                finally:
+                    renewal.cancel()
+                    try:
+                        await redis.release_lock(lock_key, token)
+                    except Exception as e:
+                        logger.warning("Single-flight lock release failed for %s: %s", key, e)
+
+            if time.monotonic() >= deadline:
+                raise HTTPException(status_code=409, detail="Another request is already processing this payment")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+    async def _keep_lock(self, key: str, lock_key: str, token: str):
+        interval = max(self.lock_ttl / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await redis.extend_lock(lock_key, token, self.lock_ttl):
+                    logger.warning("Single-flight lock for %s was lost while the call was running", key)
+                    return
+            except Exception as e:
+                logger.warning("Single-flight lock renewal failed for %s: %s", key, e)
+
+
+verify_flight = SingleFlight(
+    lock_ttl=settings.VERIFY_LOCK_TTL,
+    wait_timeout=settings.VERIFY_WAIT_TIMEOUT
+)
@@ -0,0 +1,147 @@
+from dataclasses import dataclass, asdict
+from decimal import Decimal
+from typing import Optional, Dict
+from core.config import settings
+from utils.cache import TTLCache
+from utils.logger import logger
+from utils.redis import redis, RedisSerializationError
+
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class TransactionRecord:
+    """Compact view of a transaction used by the redirect endpoints"""
+    gateway_token: str
+    callback_url: str
+    gateway_url: Optional[str]
+    website_id: int
+    amount: Decimal
+    status: str
+    ref_id: Optional[str] = None
+
+    @classmethod
+    def from_transaction(cls, transaction) -> "TransactionRecord":
+        return cls(
+            gateway_token=transaction.gateway_token,
+            callback_url=transaction.callback_url,
+            gateway_url=transaction.gateway_url,
+            website_id=transaction.website_id,
+            amount=Decimal(transaction.amount),
+            status=transaction.status,
+            ref_id=transaction.ref_id
+        )
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data["amount"] = str(self.amount)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TransactionRecord":
+        return cls(**{**data, "amount": Decimal(data["amount"])})
+
+
+class TransactionCache:
+    """
+    Gateway token -> TransactionRecord cache.
+
+    Records are written when a transaction is created and refreshed when its
+    status changes. The local tier has a short TTL because status updates made
+    on other replicas only reach it through Redis; callback_url, gateway_url,
+    website_id and amount never change after creation.
+    """
+
+    def __init__(self):
+        self.local = TTLCache(
+            maxsize=settings.TRANSACTION_CACHE_MAXSIZE,
+            ttl=settings.TRANSACTION_CACHE_LOCAL_TTL
+        )
+        self.redis_hits = 0
+        self.db_loads = 0
+
+    @staticmethod
+    def _redis_key(gateway_token: str) -> str:
+        return f"txn:{gateway_token}"
+
+    async def set(self, record: TransactionRecord):
+        self.local.set(record.gateway_token, record)
+        try:
+            await redis.set(
+                self._redis_key(record.gateway_token),
+                record.to_dict(),
+                expire=settings.TRANSACTION_CACHE_TTL
+            )
+        except Exception as e:
+            logger.warning("Transaction cache Redis write failed: %s", e)
+
+    async def get(self, gateway_token: str) -> Optional[TransactionRecord]:
+        """Look the token up in the cache tiers only"""
+        record = self.local.get(gateway_token, _MISSING)
+        if record is not _MISSING:
+            return record
+
+        redis_key = self._redis_key(gateway_token)
+        try:
+            cached = await redis.get(redis_key)
+            record = TransactionRecord.from_dict(cached) if cached is not None else None
+        except (RedisSerializationError, TypeError, KeyError, ArithmeticError, AttributeError) as e:
+            # Unreadable or written by an older record layout: a miss, and
+            # dropped so the database load replaces it
+            logger.warning("Discarding unreadable transaction cache entry %s: %s", gateway_token, e)
+            await self._discard(redis_key)
+            return None
+        except Exception as e:
+            logger.warning("Transaction cache Redis read failed: %s", e)
+            return None
+
+        if record is not None:
+            self.redis_hits += 1
+            self.local.set(gateway_token, record)
+        return record
+
+    @staticmethod
+    async def _discard(redis_key: str):
+        try:
+            await redis.delete(redis_key)
+        except Exception as e:
+            logger.warning("Transaction cache Redis delete failed: %s", e)
+
+    async def fetch(self, gateway_token: str, transaction_repo=None) -> Optional[TransactionRecord]:
+        """
+        Look the token up in the cache, loading it from the database on a miss.
+        Without a repository a session is only opened when the cache misses.
+        """
+        record = await self.get(gateway_token)
+        if record:
+            return record
+
+        self.db_loads += 1
+        if transaction_repo is not None:
+            transaction = await transaction_repo.get_by_gateway_token(gateway_token)
+        else:
+            # Imported here to avoid a cycle with the repository module
+            from db.session import async_session
+            from repositories.transaction import TransactionRepository
+            async with async_session() as db:
+                transaction = await TransactionRepository(db).get_by_gateway_token(gateway_token)
+
+        if not transaction:
+            return None
+
+        record = TransactionRecord.from_transaction(transaction)
+        await self.set(record)
+        return record
+
+    def stats(self) -> Dict[str, int]:
+        local = self.local.stats()
+        return {
+            "size": local["size"],
+            "local_hits": local["hits"],
+            "local_misses": local["misses"],
+            "redis_hits": self.redis_hits,
+            "db_loads": self.db_loads
+        }
+
+
+transaction_cache = TransactionCache()
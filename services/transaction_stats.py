@@ -0,0 +1,220 @@
+import asyncio
+import secrets
+from decimal import Decimal
+from typing import Dict, List, Optional
+from core.config import settings
+from utils.logger import logger
+from utils.redis import redis
+
+COUNT_PREFIX = "count:"
+COMPLETED_AMOUNT = "amount:completed"
+SEEDED = "seeded"
+RECONCILE_LOCK = "stats:reconcile:lock"
+
+# KEYS: counters, delta, seed token. Apply HINCRBY pairs to the counters
+# once they are seeded, and to the delta while a seed is running, so the
+# seed can add what its aggregate may have missed
+INCREMENT = """
+if redis.call('HEXISTS', KEYS[1], 'seeded') == 1 then
+    for i = 2, #ARGV, 2 do
+        redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+    end
+end
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    for i = 2, #ARGV, 2 do
+        redis.call('HINCRBY', KEYS[2], ARGV[i], ARGV[i + 1])
+    end
+    redis.call('EXPIRE', KEYS[2], ARGV[1])
+end
+return 1
+"""
+
+# KEYS: delta, seed token. Start a seed unless one is already running;
+# returns 1 when ARGV[1] now owns it
+BEGIN_SEED = """
+if redis.call('SET', KEYS[2], ARGV[1], 'NX', 'EX', ARGV[2]) then
+    redis.call('DEL', KEYS[1])
+    return 1
+end
+return 0
+"""
+
+# KEYS: counters, delta, seed token. If ARGV[1] still owns the seed, replace
+# the counters with the aggregate in ARGV[2..] plus the changes counted in
+# the delta since the seed began
+STORE_SEED = """
+if redis.call('GET', KEYS[3]) ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], 'seeded', 1, unpack(ARGV, 2))
+local delta = redis.call('HGETALL', KEYS[2])
+for i = 1, #delta, 2 do
+    redis.call('HINCRBY', KEYS[1], delta[i], delta[i + 1])
+end
+redis.call('DEL', KEYS[2], KEYS[3])
+return 1
+"""
+
+
+def _minor_units(amount) -> int:
+    # Amounts are Numeric(10, 2); keep them as integer cents in Redis
+    return int(Decimal(amount) * 100)
+
+
+class TransactionStats:
+    """
+    Per-website transaction counters kept in a Redis hash.
+
+    The repository reports every state change (creation and status updates)
+    and reads are a single HGETALL. Only seeded hashes are served: the first
+    read of a website aggregates it from the primary and stores the result.
+    Changes counted while a seed runs are also kept in a delta hash and
+    added to the aggregate when it is stored, so a busy website is still
+    seeded. A change committed just before the seed began but counted just
+    after it is included twice; reconciliation, which runs at startup and
+    then periodically, repairs that and drift from failed writes.
+    """
+
+    def __init__(self):
+        self._reconciler: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _key(website_id: int) -> str:
+        return f"stats:website:{website_id}"
+
+    def _keys(self, website_id: int) -> List[str]:
+        key = self._key(website_id)
+        return [key, f"{key}:delta", f"{key}:seed"]
+
+    async def _apply(self, website_id: int, increments: Dict[str, int]):
+        args = [settings.STATS_SEED_TTL] + [value for pair in increments.items() for value in pair]
+        try:
+            await redis.run_script(INCREMENT, keys=self._keys(website_id), args=args)
+        except Exception as e:
+            # Reconciliation will repair the counters
+            logger.warning("Stats counter update failed for website %s: %s", website_id, e)
+
+    async def record_created(self, website_id: int, status: str = "pending"):
+        await self._apply(website_id, {f"{COUNT_PREFIX}{status}": 1})
+
+    async def record_status_change(self, website_id: int, old_status: str, new_status: str, amount):
+        if old_status == new_status:
+            return
+
+        increments = {
+            f"{COUNT_PREFIX}{old_status}": -1,
+            f"{COUNT_PREFIX}{new_status}": 1
+        }
+        if new_status == "completed":
+            increments[COMPLETED_AMOUNT] = _minor_units(amount)
+        elif old_status == "completed":
+            increments[COMPLETED_AMOUNT] = -_minor_units(amount)
+        await self._apply(website_id, increments)
+
+    async def get(self, website_id: int) -> Optional[Dict]:
+        """Return cached stats, or None when the website has no counters yet"""
+        try:
+            values = await redis.hgetall(self._key(website_id))
+        except Exception as e:
+            logger.warning("Stats counter read failed for website %s: %s", website_id, e)
+            return None
+
+        if SEEDED not in values:
+            return None
+
+        return {
+            "total_amount": Decimal(int(values.get(COMPLETED_AMOUNT, 0))) / 100,
+            "status_counts": {
+                field[len(COUNT_PREFIX):]: int(value)
+                for field, value in values.items()
+                if field.startswith(COUNT_PREFIX) and int(value) != 0
+            }
+        }
+
+    async def begin_seed(self, website_id: int) -> Optional[str]:
+        """
+        Start collecting changes for a website before its aggregate is read;
+        returns the token to pass to `store`, or None if another seed is running.
+        """
+        token = secrets.token_hex(16)
+        _, delta_key, seed_key = self._keys(website_id)
+        try:
+            started = await redis.run_script(
+                BEGIN_SEED, keys=[delta_key, seed_key], args=[token, settings.STATS_SEED_TTL]
+            )
+        except Exception as e:
+            logger.warning("Stats counter seed failed for website %s: %s", website_id, e)
+            return None
+        return token if started else None
+
+    async def store(self, website_id: int, stats: Dict, token: Optional[str]) -> bool:
+        """
+        Overwrite a website's counters with values aggregated after
+        `begin_seed` returned `token`, plus the changes counted since.
+        """
+        if token is None:
+            return False
+        mapping = {
+            f"{COUNT_PREFIX}{status}": count
+            for status, count in stats["status_counts"].items()
+        }
+        mapping[COMPLETED_AMOUNT] = _minor_units(stats["total_amount"])
+        args = [token] + [value for pair in mapping.items() for value in pair]
+        try:
+            return bool(await redis.run_script(STORE_SEED, keys=self._keys(website_id), args=args))
+        except Exception as e:
+            logger.warning("Stats counter store failed for website %s: %s", website_id, e)
+            return False
+
+    async def reconcile(self):
+        """Recompute every website's counters from the primary"""
+        # Imported here to avoid a cycle with the repository module
+        from sqlalchemy import select
+        from db.session import async_session
+        from models.website import Website
+        from repositories.transaction import TransactionRepository
+
+        async with async_session() as db:
+            website_ids = (await db.execute(select(Website.id))).scalars().all()
+            tokens = {website_id: await self.begin_seed(website_id) for website_id in website_ids}
+            stats = await TransactionRepository(db).aggregate_all_stats()
+
+        skipped = 0
+        for website_id, token in tokens.items():
+            website_stats = stats.get(website_id, {"total_amount": 0, "status_counts": {}})
+            if not await self.store(website_id, website_stats, token):
+                skipped += 1
+        if skipped:
+            # Another seed was running for them, or Redis failed; the next run retries
+            logger.info("Stats reconciliation skipped %s websites", skipped)
+
+    async def _reconcile_loop(self):
+        # First run at startup, then every interval
+        while True:
+            try:
+                # Only one replica reconciles per interval
+                if await redis.acquire_lock(RECONCILE_LOCK, expire=settings.STATS_RECONCILE_INTERVAL):
+                    await self.reconcile()
+                    logger.info("Transaction stats reconciled")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Transaction stats reconciliation failed: %s", e)
+            await asyncio.sleep(settings.STATS_RECONCILE_INTERVAL)
+
+    def start(self):
+        if self._reconciler is None or self._reconciler.done():
+            self._reconciler = asyncio.create_task(self._reconcile_loop())
+
+    async def stop(self):
+        if self._reconciler is not None:
+            self._reconciler.cancel()
+            try:
+                await self._reconciler
+            except asyncio.CancelledError:
+                pass
+            self._reconciler = None
+
+
+transaction_stats = TransactionStats()
@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+import hmac
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Set
+import aiohttp
+from core.config import settings
+from db.session import async_session
+from repositories.webhook import WebhookRepository
+from utils.http import PublicResolver, create_client_session, validate_public_url
+from utils.logger import logger
+from utils.serialization import dumps
+
+
+def sign_payload(secret: str, timestamp: str, body: bytes) -> str:
+    """HMAC-SHA256 over "<timestamp>.<body>", hex encoded"""
+    message = timestamp.encode() + b"." + body
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+class WebhookDispatcher:
+    """
+    Delivers queued webhook events to merchants.
+
+    Events are written to the webhookevent table in the same transaction as
+    the status change, so the table is the durable queue. Workers lease due
+    events with SKIP LOCKED, so any number of replicas can run. Each website
+    has its own in-flight cap, so a slow merchant only delays its own events.
+    Failed deliveries are retried with jittered exponential backoff.
+    """
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+        self._deliveries: Set[asyncio.Task] = set()
+        self._in_flight: Dict[int, int] = defaultdict(int)
+
+    def _retry_at(self, attempts: int) -> Optional[datetime]:
+        if attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+            return None
+        delay = min(settings.WEBHOOK_RETRY_MAX_DELAY, settings.WEBHOOK_RETRY_BASE_DELAY * (2 ** (attempts - 1)))
+        delay = random.uniform(delay / 2, delay)
+        return datetime.now(timezone.utc) + timedelta(seconds=delay)
+
+    async def _deliver(self, event, url: str, secret: Optional[str]):
+        body = dumps(event.payload)
+        timestamp = str(int(time.time()))
+        headers = {
+            "X-Webhook-Id": str(event.id),
+            "X-Webhook-Event": event.event,
+            "X-Webhook-Timestamp": timestamp
+        }
+
+        try:
+            if not secret:
+                # Merchants can't authenticate unsigned events; set the URL through set_webhook
+                raise ValueError("Website has no webhook secret")
+            validate_public_url(url)
+        except ValueError as e:
+            logger.warning("Webhook %s to website %s not sent: %s", event.id, event.website_id, e)
+            async with async_session() as db:
+                await WebhookRepository(db).mark_failed_attempt(event.id, str(e), None)
+            return
+        headers["X-Webhook-Signature"] = f"sha256={sign_payload(secret, timestamp, body)}"
+
+        error = None
+        try:
+            # Redirects aren't followed, so they can't lead to an internal host
+            async with self._session.post(url, data=body, headers=headers, allow_redirects=False) as response:
+                if 200 <= response.status < 300:
+                    async with async_session() as db:
+                        await WebhookRepository(db).mark_delivered(event.id)
+                    return
+                error = f"HTTP {response.status}"
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            error = f"{type(e).__name__}: {str(e)}"
+
+        attempts = event.attempts + 1
+        retry_at = self._retry_at(attempts)
+        logger.warning(
+            "Webhook %s to website %s failed (%s), attempt %s%s",
+            event.id, event.website_id, error, attempts, "" if retry_at else ", giving up"
+        )
+        async with async_session() as db:
+            await WebhookRepository(db).mark_failed_attempt(event.id, error, retry_at)
+
+    async def _run_delivery(self, event, url: str, secret: Optional[str]):
+        try:
+            await self._deliver(event, url, secret)
+        except Exception as e:
+            # The lease expires and the event is picked up again
+            logger.error("Webhook %s delivery error: %s", event.id, e)
+        finally:
+            self._in_flight[event.website_id] -= 1
+            if self._in_flight[event.website_id] <= 0:
+                del self._in_flight[event.website_id]
+
+    async def dispatch_once(self) -> int:
+        """Lease due events and start delivering them; returns how many were started"""
+        capacity = settings.WEBHOOK_CONCURRENCY - len(self._deliveries)
+        if capacity <= 0:
+            return 0
+
+        busy = [
+            website_id for website_id, count in self._in_flight.items()
+            if count >= settings.WEBHOOK_PER_WEBSITE_CONCURRENCY
+        ]
+        async with async_session() as db:
+            repo = WebhookRepository(db)
+            events = await repo.claim_due(
+                limit=capacity,
+                lease_seconds=settings.WEBHOOK_LEASE_SECONDS,
+                exclude_websites=busy
+            )
+            if not events:
+                return 0
+            targets = await repo.get_targets(event.website_id for event in events)
+
+        started = 0
+        for event in events:
+            target = targets.get(event.website_id)
+            if target is None:
+                # Webhook removed since the event was queued
+                async with async_session() as db:
+                    await WebhookRepository(db).mark_failed_attempt(event.id, "Webhook not configured", None)
+                continue
+
+            if self._in_flight[event.website_id] >= settings.WEBHOOK_PER_WEBSITE_CONCURRENCY:
+                # Leave it leased; it becomes due again when the lease expires
+                continue
+
+            self._in_flight[event.website_id] += 1
+            task = asyncio.create_task(self._run_delivery(event, *target))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+            started += 1
+        return started
+
+    async def _loop(self):
+        while True:
+            try:
+                started = await self.dispatch_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Webhook dispatch failed: %s", e)
+                started = 0
+            if not started:
+                await asyncio.sleep(settings.WEBHOOK_POLL_INTERVAL)
+
+    async def start(self):
+        if not settings.WEBHOOK_ENABLED:
+            return
+        if self._session is None or self._session.closed:
+            self._session = create_client_session(
+                limit_per_host=settings.WEBHOOK_PER_WEBSITE_CONCURRENCY,
+                connect_timeout=settings.WEBHOOK_CONNECT_TIMEOUT,
+                read_timeout=settings.WEBHOOK_READ_TIMEOUT,
+                # Refuse to connect to private, loopback and link-local addresses
+                resolver=PublicResolver()
+            )
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        # In-flight deliveries are abandoned; their leases expire and they retry
+        for task in list(self._deliveries):
+            task.cancel()
+        if self._deliveries:
+            await asyncio.gather(*self._deliveries, return_exceptions=True)
+
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+webhook_dispatcher = WebhookDispatcher()
@@ -0,0 +1,114 @@
+import asyncio
+import ipaddress
+import socket
+import aiohttp
+from aiohttp.abc import AbstractResolver
+from typing import List, Optional
+from urllib.parse import urlparse
+from core.config import settings
+from utils.serialization import dumps_str
+
+
+def is_public_address(address: str) -> bool:
+    """False for private, loopback, link-local, reserved and other non-global addresses"""
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def _ip_literal(host: str) -> Optional[str]:
+    try:
+        ipaddress.ip_address(host.split("%", 1)[0])
+    except ValueError:
+        return None
+    return host
+
+
+def validate_public_url(url: str):
+    """
+    Require an https URL whose host is not a non-public IP literal; raises
+    ValueError. Hostnames are checked when resolved (see PublicResolver).
+    """
+    parsed = urlparse(url)
+    if parsed.scheme != "https":
+        raise ValueError("URL must use https")
+    host = parsed.hostname
+    if not host:
+        raise ValueError("URL has no host")
+    if _ip_literal(host) and not is_public_address(host):
+        raise ValueError(f"URL points at non-public address {host}")
+
+
+async def resolve_public_url(url: str):
+    """validate_public_url, then require every address the host resolves to be public"""
+    validate_public_url(url)
+    parsed = urlparse(url)
+    if _ip_literal(parsed.hostname):
+        return
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            parsed.hostname, parsed.port or 443, type=socket.SOCK_STREAM
+        )
+    except OSError as e:
+        raise ValueError(f"Cannot resolve {parsed.hostname}: {e}") from e
+    for info in infos:
+        address = info[4][0]
+        if not is_public_address(address):
+            raise ValueError(f"{parsed.hostname} resolves to non-public address {address}")
+
+
+class PublicResolver(AbstractResolver):
+    """
+    Resolver that fails the connection when a host resolves to a non-public
+    address. Checking what is actually connected to, rather than the URL,
+    also covers DNS records changed after the URL was validated.
+    """
+
+    def __init__(self):
+        self._resolver = aiohttp.DefaultResolver()
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET) -> List[dict]:
+        hosts = await self._resolver.resolve(host, port, family)
+        for entry in hosts:
+            if not is_public_address(entry["host"]):
+                raise OSError(f"{host} resolves to non-public address {entry['host']}")
+        return hosts
+
+    async def close(self):
+        await self._resolver.close()
+
+
+def create_client_session(
+    limit_per_host: Optional[int] = None,
+    connect_timeout: Optional[float] = None,
+    read_timeout: Optional[float] = None,
+    resolver: Optional[AbstractResolver] = None,
+) -> aiohttp.ClientSession:
+    """
+    Build a long-lived aiohttp session with keep-alive, per-host connection
+    limits and DNS caching. Must be called from inside a running event loop.
+    """
+    connector = aiohttp.TCPConnector(
+        resolver=resolver,
+        limit=settings.HTTP_POOL_LIMIT,
+        limit_per_host=limit_per_host or settings.HTTP_POOL_LIMIT_PER_HOST,
+        ttl_dns_cache=settings.HTTP_DNS_CACHE_TTL,
+        use_dns_cache=True,
+        keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+        enable_cleanup_closed=True,
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=None,
+        connect=connect_timeout or settings.HTTP_CONNECT_TIMEOUT,
+        sock_read=read_timeout or settings.HTTP_READ_TIMEOUT,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=timeout,
+        json_serialize=dumps_str,
+        headers={
+            "Content-Type": "application/json",
+            "Accept": "application/json"
+        }
+    )
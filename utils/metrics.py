@@ -0,0 +1,144 @@
+import functools
+import os
+import time
+from typing import Dict, Optional
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+from prometheus_client.core import GaugeMetricFamily, REGISTRY
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+GATEWAY_LATENCY = Histogram(
+    "gateway_request_seconds",
+    "Latency of payment gateway calls",
+    ["provider", "operation"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20)
+)
+GATEWAY_RESULTS = Counter(
+    "gateway_requests_total",
+    "Payment gateway calls by result code",
+    ["provider", "operation", "result"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_seconds",
+    "Latency of HTTP requests by route",
+    ["method", "route", "status"]
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting to check out a database connection",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+)
+REDIS_LATENCY = Histogram(
+    "redis_command_seconds",
+    "Round-trip time of Redis operations",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+)
+
+
+def timed_redis(operation: str):
+    """Decorator recording the round-trip time of an async Redis operation"""
+    histogram = REDIS_LATENCY.labels(operation)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection"""
+
+    pool_name = "primary"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.labels(self.pool_name).observe(time.perf_counter() - start)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.pool_name = self.pool_name
+        return pool
+
+
+class PoolCollector:
+    """Reads pool occupancy at scrape time so the request path pays nothing"""
+
+    def __init__(self, engines: Dict[str, object]):
+        self.engines = {name: engine for name, engine in engines.items() if engine is not None}
+
+    def collect(self):
+        checked_out = GaugeMetricFamily("db_pool_checked_out", "Connections checked out of the pool", labels=["pool"])
+        size = GaugeMetricFamily("db_pool_size", "Configured pool size", labels=["pool"])
+        overflow = GaugeMetricFamily("db_pool_overflow", "Connections open beyond the pool size", labels=["pool"])
+        for name, engine in self.engines.items():
+            pool = engine.pool
+            checked_out.add_metric([name], pool.checkedout())
+            size.add_metric([name], pool.size())
+            overflow.add_metric([name], max(pool.overflow(), 0))
+        yield checked_out
+        yield size
+        yield overflow
+
+
+_pool_collector: Optional[PoolCollector] = None
+
+
+def register_pool_collector(engines: Dict[str, object]):
+    global _pool_collector
+    _pool_collector = PoolCollector(engines)
+    REGISTRY.register(_pool_collector)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request latency"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Label by route template, not raw path, to keep cardinality bounded
+            route = scope.get("route")
+            HTTP_LATENCY.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status["code"])
+            ).observe(time.perf_counter() - start)
+
+
+def render_metrics(registry=None) -> tuple:
+    """Return (body, content_type) for the /metrics endpoint"""
+    if registry is None and os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # Under several workers, merge the counters and histograms every
+        # worker writes to the shared directory. Pool gauges are read live
+        # and so only describe the worker answering the scrape.
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        if _pool_collector is not None:
+            registry.register(_pool_collector)
+    return generate_latest(registry or REGISTRY), CONTENT_TYPE_LATEST
@@ -1,47 +1,207 @@
 from redis import asyncio as aioredis
+from redis.exceptions import RedisError
 from core.config import settings
-import json
-from typing import Optional, Any
+import msgpack
+import time
+from typing import Optional, Any, Dict, Iterable, List
+from utils.metrics import timed_redis
+
+# Values written by `set`/`mset` are msgpack prefixed with this byte. 0xc1 is
+# never emitted by msgpack and never starts JSON or UTF-8 text, so anything
+# else found under a cache key is reported instead of guessed at.
+_PACKED = b"\xc1"
+
+
+# Delete a lock only if it still holds our value, so an expired lock that
+# another process re-acquired is left alone
+RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Push a lock's expiry forward only while it still holds our value
+EXTEND_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class RedisNotConnectedError(RuntimeError):
+    """Raised when Redis is used before `connect()` or after `disconnect()`"""
+
+
+class RedisSerializationError(ValueError):
+    """Raised when a stored value was not written by this client"""
+
+
+def serialize(value: Any) -> bytes:
+    return _PACKED + msgpack.packb(value, use_bin_type=True)
+
+
+def deserialize(raw: Optional[bytes]) -> Any:
+    if raw is None:
+        return None
+    if not raw.startswith(_PACKED):
+        raise RedisSerializationError(f"Unrecognised value format (first byte {raw[:1]!r})")
+    try:
+        return msgpack.unpackb(raw[1:], raw=False)
+    except (ValueError, msgpack.UnpackException) as e:
+        raise RedisSerializationError(f"Corrupt packed value: {e}") from e
+
 
 class Redis:
+    """
+    Async Redis client over one explicit connection pool.
+
+    The pool is opened by `connect()` in the app lifespan and closed by
+    `disconnect()`; operations never connect implicitly. Values are stored
+    with msgpack, hash and counter operations work on plain strings.
+    """
+
     def __init__(self):
-        self.redis = None
-    
+        self.pool: Optional[aioredis.ConnectionPool] = None
+        self.redis: Optional[aioredis.Redis] = None
+        self._scripts = {}
+
     async def connect(self):
-        if not self.redis:
-            self.redis = await aioredis.from_url(
-                f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}"
-            )
-    
+        if self.redis:
+            return
+        self.pool = aioredis.ConnectionPool(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            password=settings.REDIS_PASSWORD,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+            socket_keepalive=True
+        )
+        self.redis = aioredis.Redis(connection_pool=self.pool)
+        self._scripts = {}
+        try:
+            await self.redis.ping()
+        except RedisError as e:
+            await self.disconnect()
+            raise RedisError(
+                f"Cannot reach Redis at {settings.REDIS_HOST}:{settings.REDIS_PORT}: {e}"
+            ) from e
+
     async def disconnect(self):
         if self.redis:
-            await self.redis.close()
-    
+            await self.redis.aclose()
+            await self.pool.disconnect()
+        self.redis = None
+        self.pool = None
+
+    @property
+    def client(self) -> aioredis.Redis:
+        if self.redis is None:
+            raise RedisNotConnectedError("Redis is not connected; call redis.connect() at startup")
+        return self.redis
+
+    async def health(self) -> Dict[str, Any]:
+        """Ping Redis and report round-trip time and pool usage"""
+        if self.redis is None:
+            return {"status": "disconnected"}
+        start = time.perf_counter()
+        try:
+            await self.redis.ping()
+        except RedisError as e:
+            return {"status": "error", "error": str(e)}
+        return {
+            "status": "ok",
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            "in_use_connections": len(self.pool._in_use_connections),
+            "idle_connections": len(self.pool._available_connections),
+            "max_connections": self.pool.max_connections
+        }
+
+    def pipeline(self, transaction: bool = True):
+        """
+        Raw pipeline for batching several commands in one round trip; with
+        `transaction=True` they run as MULTI/EXEC.
+
+            async with redis.pipeline() as pipe:
+                pipe.incr("a").expire("a", 60)
+                await pipe.execute()
+        """
+        return self.client.pipeline(transaction=transaction)
+
+    @timed_redis("expire")
     async def expire(self, key, expire):
-        if self.redis:
-            await self.redis.expire(
-                key,
-                expire
-            )
-    
+        await self.client.expire(key, expire)
+
+    @timed_redis("set")
     async def set(self, key: str, value: Any, expire: int = None):
-        await self.connect()
-        if isinstance(value, (dict, list)):
-            value = json.dumps(value)
-        await self.redis.set(key, value, ex=expire)
-    
-    async def get(self, key: str) -> Optional[str]:
-        await self.connect()
-        value = await self.redis.get(key)
-        if value:
-            try:
-                return json.loads(value)
-            except:
-                return value.decode()
-        return None
-    
-    async def delete(self, key: str):
-        await self.connect()
-        await self.redis.delete(key)
+        await self.client.set(key, serialize(value), ex=expire)
+
+    @timed_redis("get")
+    async def get(self, key: str) -> Any:
+        return deserialize(await self.client.get(key))
+
+    @timed_redis("mget")
+    async def mget(self, keys: Iterable[str]) -> List[Any]:
+        """Values for `keys` in order, None for missing keys"""
+        keys = list(keys)
+        if not keys:
+            return []
+        return [deserialize(raw) for raw in await self.client.mget(keys)]
+
+    @timed_redis("mset")
+    async def mset(self, mapping: Dict[str, Any], expire: int = None):
+        """Set several keys in one round trip, optionally with a shared TTL"""
+        if not mapping:
+            return
+        packed = {key: serialize(value) for key, value in mapping.items()}
+        if expire is None:
+            await self.client.mset(packed)
+            return
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key, value in packed.items():
+                pipe.set(key, value, ex=expire)
+            await pipe.execute()
+
+    @timed_redis("delete")
+    async def delete(self, *keys: str):
+        if keys:
+            await self.client.delete(*keys)
+
+    @timed_redis("hgetall")
+    async def hgetall(self, key: str) -> Dict[str, str]:
+        values = await self.client.hgetall(key)
+        return {k.decode(): v.decode() for k, v in values.items()}
+
+    @timed_redis("acquire_lock")
+    async def acquire_lock(self, key: str, expire: int, value: Any = "1") -> bool:
+        """SET NX based lock; returns True when the lock was taken"""
+        return bool(await self.client.set(key, serialize(value), nx=True, ex=expire))
+
+    async def release_lock(self, key: str, value: Any) -> bool:
+        """Release a lock taken with acquire_lock(key, ..., value)"""
+        return bool(await self.run_script(RELEASE_LOCK, keys=[key], args=[serialize(value)]))
+
+    async def extend_lock(self, key: str, value: Any, expire: int) -> bool:
+        """Reset the TTL of a lock taken with acquire_lock(key, ..., value); False if it was lost"""
+        return bool(await self.run_script(EXTEND_LOCK, keys=[key], args=[serialize(value), expire]))
+
+    @timed_redis("run_script")
+    async def run_script(self, source: str, keys: list, args: list):
+        """Run a Lua script atomically, loading it once and calling it by SHA"""
+        script = self._scripts.get(source)
+        if script is None:
+            script = self._scripts[source] = self.client.register_script(source)
+        return await script(keys=keys, args=args)
+
+    @timed_redis("publish")
+    async def publish(self, channel: str, message: str):
+        await self.client.publish(channel, message)
+
+    async def pubsub(self):
+        return self.client.pubsub()
 
-redis = Redis() 
\ No newline at end of file
+redis = Redis()
@@ -0,0 +1,37 @@
+import orjson
+from decimal import Decimal
+from typing import Any, Callable, Optional
+from fastapi.responses import JSONResponse
+
+# UTC datetimes end in "Z", matching pydantic's JSON output
+_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    return orjson.dumps(value, default=default or _default, option=_OPTIONS)
+
+
+def dumps_str(value: Any) -> str:
+    """For APIs that expect text, such as aiohttp's json_serialize"""
+    return dumps(value).decode()
+
+
+def loads(data) -> Any:
+    return orjson.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson. Returning one from an endpoint also
+    skips FastAPI's response_model validation, so only use that for bodies the
+    service built itself.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,85 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from core.config import settings
+from utils.logger import request_id_var
+
+# Phase name -> accumulated milliseconds for the current request
+_phases: ContextVar[Optional[Dict[str, float]]] = ContextVar("timing_phases", default=None)
+
+# Most recent requests slower than SLOW_REQUEST_THRESHOLD_MS
+slow_requests: deque = deque(maxlen=settings.SLOW_REQUEST_BUFFER_SIZE)
+
+
+@contextmanager
+def timed_phase(name: str):
+    """Add the duration of the block to the current request's `name` phase"""
+    phases = _phases.get()
+    if phases is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = phases.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+
+def _server_timing(phases: Dict[str, float], total: float) -> bytes:
+    entries = [f"{name};dur={duration:.1f}" for name, duration in phases.items()]
+    entries.append(f"total;dur={total:.1f}")
+    return ", ".join(entries).encode("latin-1")
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware that returns the request's named phases in a
+    Server-Timing header and keeps the slowest requests in a ring buffer.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        phases: Dict[str, float] = {}
+        token = _phases.set(phases)
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                total = (time.perf_counter() - start) * 1000
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", _server_timing(phases, total))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _phases.reset(token)
+            total = (time.perf_counter() - start) * 1000
+            if total >= settings.SLOW_REQUEST_THRESHOLD_MS:
+                slow_requests.append({
+                    "at": datetime.now(timezone.utc).isoformat(),
+                    "request_id": request_id_var.get(),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status["code"],
+                    "total_ms": round(total, 1),
+                    "phases": {name: round(duration, 1) for name, duration in phases.items()}
+                })
+
+
+def get_slow_requests(limit: Optional[int] = None) -> List[Dict]:
+    """Slow requests, newest first"""
+    items = list(reversed(slow_requests))
+    return items[:limit] if limit else items